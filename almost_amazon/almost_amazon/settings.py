@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryInstrumentationMiddleware',
+    'api.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,21 +80,95 @@ WSGI_APPLICATION = 'almost_amazon.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# api.db_pool — PostgreSQL с пулом соединений процесса. MAX_SIZE — не меньше
+# числа потоков процесса (для async-представлений — ASYNC_DB_EXECUTOR['MAX_WORKERS']);
+# HEALTH_CHECK_INTERVAL 0 — проверка SELECT 1 при каждой выдаче соединения.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'api.db_pool',
         'NAME': 'almost_amazon_db',
         'USER': 'almost_amazon_db',
         'PASSWORD': 'almost_amazon_db',
         'HOST': '127.0.0.1',
         'PORT': '5432',
+        'POOL': {
+            'MIN_SIZE': 2,
+            'MAX_SIZE': 20,
+            'MAX_LIFETIME': 30 * 60,
+            'TIMEOUT': 10,
+            'HEALTH_CHECK_INTERVAL': 0,
+        },
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # кэш ответов каталога (api.cache); в продакшене — общий для всех процессов
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
-    ]
+        'api.authentication.CachedTokenAuthentication'
+    ],
+    # orjson, если установлен, иначе стандартный json, см. api.renderers
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Кэш token -> user для api.authentication.CachedTokenAuthentication.
+# CACHE_ALIAS — необязательный общий кэш из CACHES для всех процессов.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'CACHE_ALIAS': None,
+}
+
+# потоки для запросов к БД из async-представлений api.async_views,
+# у каждого потока своё соединение, поэтому это и предел соединений процесса
+ASYNC_DB_EXECUTOR = {
+    'MAX_WORKERS': 16,
+}
+
+# Реплики для чтения, см. api.db_router: alias из DATABASES -> вес (доля чтений).
+# Локально репликами могут быть копии SQLite, см. almost_amazon/settings_sqlite.py.
+# Миграции применяются только к основной БД.
+# CACHE_ALIAS — кэш меток read-your-writes, для нескольких процессов — общий.
+DATABASE_ROUTERS = ['api.db_router.ReplicaRouter']
+DATABASE_REPLICAS = {
+    'WEIGHTS': {},
+    'STICKY_SECONDS': 5,
+    'EJECT_SECONDS': 30,
+    'CHECK_SECONDS': 5,
+    'CACHE_ALIAS': 'default',
+}
+
+# сколько секунд хранится ответ на запрос с Idempotency-Key, см. api.idempotency
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# учёт SQL по запросам, см. api.middleware: SAMPLE_RATE — доля учитываемых запросов,
+# заголовок Server-Timing с данными о SQL отдаётся клиентам только при DEBUG
+SQL_INSTRUMENTATION = {
+    'SAMPLE_RATE': 0.05,
+    'SLOW_REQUEST_MS': 500,
+    'N_PLUS_ONE_THRESHOLD': 10,
+    'SLOWEST_QUERIES': 3,
+    'SERVER_TIMING': DEBUG,
 }
 
 # Password validation
@@ -0,0 +1,26 @@
+"""Настройки для запуска без PostgreSQL: pytest --ds=almost_amazon.settings_sqlite.
+
+Основная БД и две реплики — SQLite. В тестах реплики — зеркала default
+(TEST MIRROR): данные те же, но чтение идёт через отдельные соединения,
+и по ним видно, куда ReplicaRouter отправил запрос. Вне тестов файлы
+реплик — копии db.sqlite3, которые нужно обновлять вручную.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica1.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+    'replica2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica2.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
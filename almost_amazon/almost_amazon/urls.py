@@ -17,17 +17,33 @@ from django.contrib import admin
 from django.shortcuts import redirect
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from api.views import OrderViewSet, ProductViewSet, ProductReviewViewSet, ProductCollectionViewSet
+from api import async_views
+from api.views import OrderViewSet, ProductViewSet, ProductReviewViewSet, ProductCollectionViewSet, MetricsViewSet, \
+    SalesAnalyticsViewSet
 
 router = DefaultRouter()
 router.register('products', ProductViewSet, basename='products')
 router.register('orders', OrderViewSet, basename='orders')
 router.register('product-reviews', ProductReviewViewSet, basename='product_reviews')
 router.register('product-collections', ProductCollectionViewSet, basename='product_collections')
+router.register('metrics', MetricsViewSet, basename='metrics')
+router.register('analytics/sales', SalesAnalyticsViewSet, basename='sales_analytics')
+
+# async-представления чтения каталога для ASGI, см. api.async_views
+async_urlpatterns = [
+    path('products/', async_views.product_list, name='async_products-list'),
+    path('products/suggest/', async_views.product_suggest, name='async_products-suggest'),
+    path('products/<int:pk>/', async_views.product_detail, name='async_products-detail'),
+    path('product-reviews/', async_views.review_list, name='async_product_reviews-list'),
+    path('product-reviews/<int:pk>/', async_views.review_detail, name='async_product_reviews-detail'),
+    path('product-collections/', async_views.collection_list, name='async_product_collections-list'),
+    path('product-collections/<int:pk>/', async_views.collection_detail, name='async_product_collections-detail'),
+]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include(router.urls)),
+    path('api/async/v1/', include(async_urlpatterns)),
     path('', lambda request: redirect('api/v1/'))
 
 ]
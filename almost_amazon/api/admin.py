@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from .analytics import schedule_rebuild
 from .models import Order, Product, ProductReview, ProductCollection, Position
 
 
@@ -16,17 +18,25 @@ class CollectinInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     inlines = (PositionInline,)
     ordering = ('-created_at',)
+    list_select_related = ('creator',)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # заказ и позиции сохранены в обход OrderSerializer
+        schedule_rebuild()
 
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'price')
+    list_display = ('id', 'name', 'price', 'rating_avg', 'review_count')
     ordering = ('id',)
 
 
 @admin.register(ProductReview)
 class ProductReviewAdmin(admin.ModelAdmin):
     exclude = ('creator',)
+    # __str__ отзыва обращается к товару и автору
+    list_select_related = ('product_id', 'creator')
 
 
 @admin.register(ProductCollection)
@@ -0,0 +1,214 @@
+"""Сводные таблицы продаж DailySales и DailyProductSales.
+
+Изменение заказа переводится в разницу его вклада в сводки (было / стало),
+и затронутые строки каждой сводки правятся одним INSERT ... ON CONFLICT DO
+UPDATE SET x = x + EXCLUDED.x, поэтому число запросов не растёт с числом
+товаров. Без поддержки ON CONFLICT строки обновляются через bulk_update и
+создаются через bulk_create.
+Отчёт читает только сводки, без GROUP BY по заказам и позициям.
+
+Инкрементально учитываются только записи через API (OrderSerializer,
+пакетные переходы статуса) и удаление заказа (сигнал pre_delete). После
+правки заказа в админке, удаления товара вместе с его позициями и
+recalculate_order_totals сводки целиком пересчитываются после коммита
+(schedule_rebuild). Изменения через QuerySet.update(), bulk-операции и SQL
+в обход моделей не видны: после них нужен rebuild_sales_summary.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySales, Order, Position
+
+Contribution = namedtuple('Contribution', ['date', 'status', 'total', 'items'])
+
+
+def sales_day(value):
+    """День продажи в текущей временной зоне, как у TruncDate."""
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def order_contribution(order, positions):
+    """Вклад заказа с позициями positions в сводки."""
+    return Contribution(
+        date=sales_day(order.created_at),
+        status=order.status,
+        total=order.total,
+        items=tuple((p.product_id_id, p.amount, p.unit_price * p.amount) for p in positions),
+    )
+
+
+def record_sales(before=(), after=()):
+    """Переносит в сводки разницу между прежним и новым вкладом заказов."""
+    days = defaultdict(lambda: [0, 0, Decimal(0)])
+    products = defaultdict(lambda: [0, Decimal(0)])
+    for sign, contributions in ((-1, before), (1, after)):
+        for c in contributions:
+            row = days[(c.date, c.status)]
+            row[0] += sign
+            row[2] += sign * c.total
+            for product_pk, amount, revenue in c.items:
+                row[1] += sign * amount
+                product_row = products[(c.date, product_pk)]
+                product_row[0] += sign * amount
+                product_row[1] += sign * revenue
+
+    with transaction.atomic():
+        _add(DailySales, ('date', 'status'), {
+            key: {'orders': orders, 'units': units, 'revenue': revenue}
+            for key, (orders, units, revenue) in days.items()
+        })
+        _add(DailyProductSales, ('date', 'product_id_id'), {
+            key: {'units': units, 'revenue': revenue} for key, (units, revenue) in products.items()
+        })
+
+
+def record_transition(orders, from_status, to_status):
+    """Переносит заказы queryset orders из строк from_status в строки to_status сводки по дням."""
+    days = defaultdict(lambda: [0, 0, Decimal(0)])
+    for row in (orders.annotate(day=TruncDate('created_at')).order_by()
+                .values('day').annotate(orders=Count('id'), revenue=Sum('total'))):
+        days[row['day']][0] = row['orders']
+        days[row['day']][2] = row['revenue']
+    for row in (Position.objects.filter(order_id__in=orders).annotate(day=TruncDate('order_id__created_at'))
+                .order_by().values('day').annotate(units=Sum('amount'))):
+        days[row['day']][1] = row['units']
+
+    rows = defaultdict(lambda: {'orders': 0, 'units': 0, 'revenue': Decimal(0)})
+    for date, (count, units, revenue) in days.items():
+        for status, sign in ((from_status, -1), (to_status, 1)):
+            row = rows[(date, status)]
+            row['orders'] += sign * count
+            row['units'] += sign * units
+            row['revenue'] += sign * revenue
+    _add(DailySales, ('date', 'status'), rows)
+
+
+def _add(model, key_fields, rows):
+    """Прибавляет к строкам сводки model разницу rows {значения key_fields: {поле: разница}}."""
+    rows = {key: deltas for key, deltas in sorted(rows.items()) if any(deltas.values())}
+    if not rows:
+        return
+    using = router.db_for_write(model)
+    connection = connections[using]
+    if _supports_upsert(connection):
+        _upsert(connection, model, key_fields, rows)
+        return
+    try:
+        with transaction.atomic(using=using):
+            _bulk_add(model, key_fields, rows)
+    except IntegrityError:
+        # строку успел создать параллельный запрос
+        with transaction.atomic(using=using):
+            _bulk_add(model, key_fields, rows)
+
+
+def _supports_upsert(connection):
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 24, 0)
+
+
+def _upsert(connection, model, key_fields, rows):
+    quote = connection.ops.quote_name
+    value_fields = list(next(iter(rows.values())))
+    fields = [model._meta.get_field(name) for name in (*key_fields, *value_fields)]
+    table = quote(model._meta.db_table)
+    columns = [quote(field.column) for field in fields]
+    conflict = ', '.join(columns[:len(key_fields)])
+    updates = ', '.join(f'{column} = {table}.{column} + EXCLUDED.{column}' for column in columns[len(key_fields):])
+
+    keys = list(rows)
+    batch_size = max(connection.ops.bulk_batch_size(fields, keys), 1)
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            placeholders = ', '.join(['(%s)' % ', '.join(['%s'] * len(fields))] * len(batch))
+            params = [
+                field.get_db_prep_save(value, connection)
+                for key in batch
+                for field, value in zip(fields, (*key, *(rows[key][name] for name in value_fields)))
+            ]
+            cursor.execute(
+                f'INSERT INTO {table} ({", ".join(columns)}) VALUES {placeholders} '
+                f'ON CONFLICT ({conflict}) DO UPDATE SET {updates}',
+                params,
+            )
+
+
+def _bulk_add(model, key_fields, rows):
+    value_fields = list(next(iter(rows.values())))
+    lookups = {f'{name}__in': {key[i] for key in rows} for i, name in enumerate(key_fields)}
+    found = {}
+    for obj in model.objects.select_for_update().filter(**lookups):
+        key = tuple(getattr(obj, name) for name in key_fields)
+        if key in rows:
+            for field, value in rows[key].items():
+                setattr(obj, field, F(field) + value)
+            found[key] = obj
+
+    model.objects.bulk_update(found.values(), value_fields)
+    model.objects.bulk_create([
+        model(**dict(zip(key_fields, key)), **deltas) for key, deltas in rows.items() if key not in found
+    ])
+
+
+def rebuild_sales_summary():
+    """Полный пересчёт сводок по заказам и позициям."""
+    orders = (Order.objects.annotate(day=TruncDate('created_at')).order_by()
+              .values('day', 'status').annotate(orders=Count('id'), revenue=Sum('total')))
+    positions = Position.objects.annotate(day=TruncDate('order_id__created_at')).order_by()
+    units = {
+        (row['day'], row['status']): row['units']
+        for row in positions.values('day', status=F('order_id__status')).annotate(units=Sum('amount'))
+    }
+    revenue = ExpressionWrapper(F('amount') * F('unit_price'), output_field=DecimalField())
+    by_product = positions.values('day', 'product_id').annotate(units=Sum('amount'), revenue=Sum(revenue))
+
+    with transaction.atomic():
+        DailySales.objects.all().delete()
+        DailyProductSales.objects.all().delete()
+        DailySales.objects.bulk_create([
+            DailySales(date=row['day'], status=row['status'], orders=row['orders'],
+                       units=units.get((row['day'], row['status']), 0), revenue=row['revenue'])
+            for row in orders
+        ], batch_size=1000)
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=row['day'], product_id_id=row['product_id'],
+                              units=row['units'], revenue=row['revenue'])
+            for row in by_product
+        ], batch_size=1000)
+
+
+def _rebuild_on_commit():
+    rebuild_sales_summary()
+
+
+def schedule_rebuild(using=None):
+    """Полный пересчёт сводок после коммита текущей транзакции, один раз на транзакцию."""
+    connection = transaction.get_connection(using)
+    if not any(func is _rebuild_on_commit for _, func in connection.run_on_commit):
+        transaction.on_commit(_rebuild_on_commit, using=using)
+
+
+def sales_report(date_from=None, date_to=None, limit=20):
+    """Выручка, заказы и проданные единицы по дням, статусам и лучшим товарам."""
+    days = DailySales.objects.exclude(orders=0)
+    products = DailyProductSales.objects.exclude(units=0)
+    if date_from:
+        days, products = days.filter(date__gte=date_from), products.filter(date__gte=date_from)
+    if date_to:
+        days, products = days.filter(date__lte=date_to), products.filter(date__lte=date_to)
+
+    totals = {'orders': Sum('orders'), 'units': Sum('units'), 'revenue': Sum('revenue')}
+    return {
+        'by_day': days.values('date').annotate(**totals).order_by('date'),
+        'by_status': days.values('status').annotate(**totals).order_by('status'),
+        'by_product': products.values('product_id', name=F('product_id__name'))
+                              .annotate(units=Sum('units'), revenue=Sum('revenue'))
+                              .order_by('-revenue', 'product_id')[:limit],
+    }
@@ -1,5 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .middleware import instrument_connection
+        from .search import ensure_sqlite_search
+
+        post_migrate.connect(ensure_sqlite_search, sender=self)
+        connection_created.connect(instrument_connection)
@@ -0,0 +1,62 @@
+"""Async-представления каталога для ASGI.
+
+Под ASGI Django выполняет синхронные представления в одном общем потоке,
+и медленный запрос к БД задерживает все остальные. Эти представления
+асинхронные: соединение с клиентом обслуживает цикл событий, а сам
+обработчик DRF вместе с запросами к БД и рендерингом ответа выполняется
+в ограниченном пуле потоков db_executor. Ответы совпадают с /api/v1/.
+"""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .views import ProductCollectionViewSet, ProductReviewViewSet, ProductViewSet
+
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_EXECUTOR['MAX_WORKERS'],
+    thread_name_prefix='async-db',
+)
+
+
+def _call_in_db_thread(func, *args, **kwargs):
+    # в потоке пула нет request_started/request_finished, соединения проверяем сами
+    close_old_connections()
+    try:
+        response = func(*args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Выполняет синхронный код с доступом к БД в пуле db_executor."""
+    loop = asyncio.get_running_loop()
+    # контекст запроса (например, api.db_router.replica_reads) нужен и в потоке пула
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(db_executor, partial(context.run, _call_in_db_thread, func, *args, **kwargs))
+
+
+def async_read_view(viewset, actions):
+    """Async-обёртка над действиями чтения ViewSet."""
+    view = viewset.as_view(actions)
+
+    async def async_view(request, *args, **kwargs):
+        return await run_in_db_thread(view, request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    return async_view
+
+
+product_list = async_read_view(ProductViewSet, {'get': 'list'})
+product_detail = async_read_view(ProductViewSet, {'get': 'retrieve'})
+product_suggest = async_read_view(ProductViewSet, {'get': 'suggest'})
+review_list = async_read_view(ProductReviewViewSet, {'get': 'list'})
+review_detail = async_read_view(ProductReviewViewSet, {'get': 'retrieve'})
+collection_list = async_read_view(ProductCollectionViewSet, {'get': 'list'})
+collection_detail = async_read_view(ProductCollectionViewSet, {'get': 'retrieve'})
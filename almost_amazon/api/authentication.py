@@ -0,0 +1,157 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """Ограниченный LRU-кэш token -> (user, token) с временем жизни записей.
+
+    Кэш живёт в памяти процесса. Если задан CACHE_ALIAS, промахи сначала
+    проверяются в общем кэше Django, и только потом идут в БД. Тогда каждая
+    запись хранит версию пользователя из общего кэша и перед использованием
+    сверяется с ней: delete_user() в любом процессе меняет версию, и записи
+    этого пользователя во всех процессах перестают действовать сразу, а не
+    через TTL.
+    """
+
+    def __init__(self, max_size=10000, ttl=60, cache_alias=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def shared_key(key):
+        return f'auth-token:{key}'
+
+    @staticmethod
+    def version_key(user_pk):
+        return f'auth-user-version:{user_pk}'
+
+    @property
+    def shared(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def get(self, key):
+        now = time.monotonic()
+        shared = self.shared
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+        if entry is not None:
+            _, value, version = entry
+            if shared is None or self._valid(shared, value, version):
+                with self._lock:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.hits += 1
+                return value
+            with self._lock:
+                self._entries.pop(key, None)
+
+        stored = shared.get(self.shared_key(key)) if shared else None
+        if stored is not None and not self._valid(shared, *stored):
+            stored = None
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._store(key, *stored, now)
+        return stored[0]
+
+    def set(self, key, value):
+        shared = self.shared
+        version = None
+        if shared:
+            user_pk = value[0].pk
+            # add не перезапишет версию, которую другой процесс только что сменил
+            shared.add(self.version_key(user_pk), uuid.uuid4().hex, None)
+            version = shared.get(self.version_key(user_pk))
+            shared.set(self.shared_key(key), (value, version), self.ttl)
+        self._store(key, value, version, time.monotonic())
+
+    def _valid(self, shared, value, version):
+        return version is not None and shared.get(self.version_key(value[0].pk)) == version
+
+    def _store(self, key, value, version, now):
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.shared:
+            self.shared.delete(self.shared_key(key))
+
+    def delete_user(self, user_pk):
+        """Удаляет записи пользователя; в общем кэше меняет его версию для всех процессов."""
+        with self._lock:
+            keys = [key for key, (_, (user, _), _) in self._entries.items() if user.pk == user_pk]
+            for key in keys:
+                del self._entries[key]
+        if self.shared:
+            self.shared.set(self.version_key(user_pk), uuid.uuid4().hex, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.shared_hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def _build_token_cache():
+    options = getattr(settings, 'TOKEN_AUTH_CACHE', {})
+    return TokenCache(
+        max_size=options.get('MAX_SIZE', 10000),
+        ttl=options.get('TTL', 60),
+        cache_alias=options.get('CACHE_ALIAS'),
+    )
+
+
+token_cache = _build_token_cache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, которая не ходит в БД за уже известными токенами.
+
+    Записи удаляются при удалении токена и при изменении пользователя
+    (в том числе деактивации), см. api.signals. Без общего кэша
+    (TOKEN_AUTH_CACHE['CACHE_ALIAS']) в других процессах запись доживает
+    до истечения TTL, с ним — перестаёт действовать сразу.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            cached = super().authenticate_credentials(key)
+            token_cache.set(key, cached)
+
+        user, token = cached
+        # каждый запрос получает свою копию, чтобы не менять общий объект из кэша
+        return copy.copy(user), token
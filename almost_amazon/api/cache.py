@@ -0,0 +1,117 @@
+"""Кэш ответов каталога с версиями моделей и ETag.
+
+Ключ ответа строится из пути, параметров запроса, формата и текущих
+версий моделей, от которых ответ зависит. Запись в модель меняет её
+версию, и старые ответы просто перестают находиться, а затем вытесняются
+LRU-кэшем. Для нескольких процессов RESPONSE_CACHE_ALIAS должен указывать
+на общий кэш (memcached, redis), иначе версии в процессах расходятся.
+"""
+import hashlib
+import uuid
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    return f'model-version:{model._meta.label_lower}'
+
+
+def get_model_versions(models):
+    """Текущие версии моделей; недостающие (вытесненные) создаются заново случайными."""
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_model_version(model):
+    """Делает устаревшими все закэшированные ответы, зависящие от модели.
+
+    Версия меняется сразу и ещё раз после коммита, чтобы ответ, собранный
+    параллельным запросом до коммита, не остался в кэше под новой версией.
+    """
+    def bump():
+        get_cache().set(_version_key(model), uuid.uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return etag in (tag.strip() for tag in header.split(',')) or header.strip() == '*'
+
+
+def _build_response(request, entry):
+    etag, content, content_type = entry
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def cache_response(handler):
+    """Декоратор действия ViewSet с CachedResponseMixin."""
+    @wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        return self.get_cached_response(handler.__get__(self), request, *args, **kwargs)
+
+    return wrapper
+
+
+class CachedResponseMixin:
+    """Кэширует ответы list и retrieve, отвечает 304 на If-None-Match без обращения к БД."""
+    cache_models = ()
+    cache_timeout = 300
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, request):
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        versions = get_model_versions(self.cache_models)
+        # ссылки next/previous в теле абсолютные: от схемы и хоста зависит ответ
+        raw = '|'.join([request.scheme, request.get_host(), request.path, query,
+                        request.accepted_renderer.format, *versions])
+        return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            content = renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+            etag = '"%s"' % hashlib.sha1(content).hexdigest()
+            content_type = f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type
+            entry = (etag, content, content_type)
+            cache.set(key, entry, self.cache_timeout)
+
+        return _build_response(request, entry)
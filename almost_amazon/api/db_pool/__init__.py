@@ -0,0 +1 @@
+"""Бэкенд PostgreSQL с пулом соединений: ENGINE 'api.db_pool', параметры пула — в DATABASES[...]['POOL']."""
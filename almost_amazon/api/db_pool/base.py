@@ -0,0 +1,82 @@
+from functools import partial
+
+import psycopg2.extensions
+import psycopg2.extras
+from django.db.backends.postgresql import base
+
+from .creation import DatabaseCreation
+from .pool import PoolTimeout, close_pools, get_pool
+
+Database = base.Database
+
+
+def _connect(conn_params):
+    connection = Database.connect(**conn_params)
+    # как в postgresql.DatabaseWrapper.get_new_connection
+    psycopg2.extras.register_default_jsonb(conn_or_curs=connection, loads=lambda x: x)
+    return connection
+
+
+def _check(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+def _reset(connection):
+    if connection.closed:
+        raise Database.InterfaceError('Соединение закрыто')
+    if connection.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL, в котором close() возвращает соединение в пул процесса, а не закрывает его."""
+    creation_class = DatabaseCreation
+    pool = None
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict.get('POOL', {})
+        # у тестовой БД и у служебной базы postgres параметры свои, и пулы тоже
+        key = (self.alias, tuple(sorted((name, repr(value)) for name, value in conn_params.items())))
+        return get_pool(
+            key,
+            partial(_connect, conn_params),
+            min_size=options.get('MIN_SIZE', 0),
+            max_size=options.get('MAX_SIZE', 10),
+            max_lifetime=options.get('MAX_LIFETIME', 3600),
+            timeout=options.get('TIMEOUT', 10),
+            check=_check,
+            check_interval=options.get('HEALTH_CHECK_INTERVAL', 0),
+            reset=_reset,
+        )
+
+    def close_database_pools(self, database_name):
+        """Закрывает пулы соединений с базой database_name, например перед DROP DATABASE."""
+        close_pools(lambda key: ('database', repr(database_name)) in key[1])
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as exc:
+            raise Database.OperationalError(str(exc)) from exc
+        self.pool = pool
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None and self.pool is not None:
+            with self.wrap_database_errors:
+                self.pool.release(self.connection)
+        else:
+            super()._close()
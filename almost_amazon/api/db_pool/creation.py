@@ -0,0 +1,24 @@
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Перед DROP DATABASE и CREATE DATABASE ... TEMPLATE закрывает пулы соединений с этой базой.
+
+    Иначе соединения, возвращённые в пул, держат базу открытой и PostgreSQL
+    отказывается её удалять или копировать.
+    """
+
+    def _create_test_db(self, verbosity, autoclobber, keepdb=False):
+        # существующая тестовая БД удаляется перед созданием
+        self.connection.close_database_pools(self._get_test_db_name())
+        return super()._create_test_db(verbosity, autoclobber, keepdb)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close()
+        self.connection.close_database_pools(self.connection.settings_dict['NAME'])
+        self.connection.close_database_pools(self.get_test_db_clone_settings(suffix)['NAME'])
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self.connection.close_database_pools(test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
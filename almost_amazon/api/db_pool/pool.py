@@ -0,0 +1,236 @@
+"""Пул соединений с БД для бэкенда api.db_pool.
+
+Соединение, которое Django закрывает в конце запроса, возвращается в пул
+и достаётся следующему запросу любого потока процесса. Пул не зависит от
+драйвера: соединения создаёт, проверяет и сбрасывает переданные функции.
+Пулы закрываются close_pools() при выходе из процесса; дочерний процесс
+после fork забывает пулы родителя, не закрывая его соединения.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """За timeout секунд не освободилось ни одного соединения."""
+
+
+class ConnectionPool:
+    """Пул от min_size до max_size соединений.
+
+    Свободное соединение перед выдачей проверяется функцией check, если
+    пролежало в пуле дольше check_interval секунд; соединение старше
+    max_lifetime закрывается. Если заняты все max_size соединений, запрос
+    ждёт освобождения до timeout секунд, затем получает PoolTimeout.
+    """
+
+    def __init__(self, connect, min_size=0, max_size=10, max_lifetime=3600, timeout=10,
+                 check=None, check_interval=0, reset=None):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.check = check
+        self.check_interval = check_interval
+        self.reset = reset
+        self.pid = os.getpid()
+        # свободные соединения: (соединение, время создания, время возврата в пул)
+        self._idle = deque()
+        # время создания выданных соединений
+        self._in_use = {}
+        self._size = 0
+        self._condition = threading.Condition()
+        # после close() возвращённые соединения закрываются
+        self._closing = False
+        self.checkouts = self.waits = self.timeouts = 0
+        self.created = self.closed = self.check_failures = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self):
+        """Соединение из пула; новое создаётся, только если свободных нет, а предел не достигнут."""
+        self._fill()
+        deadline = None
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    now = time.monotonic()
+                    if deadline is None:
+                        deadline = now + self.timeout
+                        self.waits += 1
+                    if now >= deadline:
+                        self.timeouts += 1
+                        raise PoolTimeout(f'Все {self.max_size} соединений пула заняты дольше {self.timeout} с')
+                    self._condition.wait(deadline - now)
+                    self.wait_seconds += time.monotonic() - now
+                item = self._idle.pop() if self._idle else None
+                if item is None:
+                    self._size += 1
+
+            if item is None:
+                try:
+                    connection, created_at = self._create(), time.monotonic()
+                except BaseException:
+                    self._discard()
+                    raise
+                break
+            connection, created_at, returned_at = item
+            if self._usable(connection, created_at, returned_at):
+                break
+            self._discard()
+
+        with self._condition:
+            self._in_use[id(connection)] = created_at
+            self.checkouts += 1
+        return connection
+
+    def release(self, connection):
+        """Возвращает соединение в пул; сломанное или старое закрывается."""
+        if self.pid != os.getpid():
+            # соединение родительского процесса: закрытие оборвало бы его сессию
+            return
+        with self._condition:
+            created_at = self._in_use.pop(id(connection), None)
+        if created_at is None:
+            # соединение выдано не этим пулом
+            self._close(connection)
+            return
+
+        keep = not self._closing and time.monotonic() - created_at < self.max_lifetime
+        if keep and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                keep = False
+        if not keep:
+            self._close(connection)
+            self._discard()
+            return
+        with self._condition:
+            self._idle.append((connection, created_at, time.monotonic()))
+            self._condition.notify()
+
+    def close(self):
+        """Закрывает свободные соединения; выданные закроются при возврате."""
+        with self._condition:
+            self._closing = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, _, _ in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_ms': round(self.wait_seconds * 1000, 2),
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'closed': self.closed,
+                'check_failures': self.check_failures,
+            }
+
+    def _fill(self):
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self._create()
+            except BaseException:
+                self._discard()
+                raise
+            with self._condition:
+                now = time.monotonic()
+                self._idle.appendleft((connection, now, now))
+                self._condition.notify()
+
+    def _discard(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _create(self):
+        connection = self.connect()
+        with self._condition:
+            self.created += 1
+        return connection
+
+    def _usable(self, connection, created_at, returned_at):
+        now = time.monotonic()
+        if now - created_at >= self.max_lifetime:
+            self._close(connection)
+            return False
+        if self.check is not None and now - returned_at >= self.check_interval:
+            try:
+                self.check(connection)
+            except Exception:
+                with self._condition:
+                    self.check_failures += 1
+                self._close(connection)
+                return False
+        return True
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._condition:
+            self.closed += 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, **options):
+    """Пул процесса для ключа; после fork создаётся новый, соединения родителя не используются."""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(connect, **options)
+        return pool
+
+
+def close_pools(match=None):
+    """Закрывает пулы процесса, ключ которых подходит под match(key), по умолчанию все.
+
+    Свободные соединения закрываются сразу, выданные — при возврате.
+    Следующий get_pool с тем же ключом создаст новый пул.
+    """
+    with _pools_lock:
+        keys = [key for key in _pools if match is None or match(key)]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+def _forget_pools():
+    global _pools_lock
+    # блокировку мог держать поток родителя, которого в дочернем процессе нет
+    _pools_lock = threading.Lock()
+    _pools.clear()
+
+
+atexit.register(close_pools)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+
+def pool_stats():
+    """Счётчики пулов текущего процесса по alias БД."""
+    with _pools_lock:
+        pools = [(key[0], pool) for key, pool in _pools.items() if pool.pid == os.getpid()]
+    return {alias: pool.stats() for alias, pool in pools}
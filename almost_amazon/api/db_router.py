@@ -0,0 +1,229 @@
+"""Чтение с реплик БД с read-your-writes для пользователя, который только что писал.
+
+ReplicaRoutingMiddleware разрешает чтение с реплик на время запроса с
+безопасным методом (GET, HEAD, OPTIONS), а ReplicaRouter выбирает для
+чтения реплику из DATABASE_REPLICAS['WEIGHTS'] по взвешенному кругу.
+Запись и любые запросы вне такого запроса идут в основную БД. После
+запроса с другим методом клиент (по хэшу заголовка Authorization или
+cookie сессии) STICKY_SECONDS читает с основной БД, чтобы видеть свои
+изменения несмотря на отставание реплик. Реплика, не ответившая на
+проверку, исключается на EJECT_SECONDS.
+"""
+import asyncio
+import hashlib
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# можно ли читать с реплик в текущем запросе
+replica_reads = ContextVar('replica_reads', default=False)
+# реплика, выбранная для текущего запроса: [] до первого чтения, затем [alias или None]
+request_replica = ContextVar('request_replica', default=None)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPool:
+    """Взвешенный круговой выбор реплики с исключением неисправных.
+
+    Вес — доля чтений на реплику (плавный взвешенный round-robin, как в
+    nginx). Соединение с репликой проверяется не чаще раза в CHECK_SECONDS;
+    при ошибке реплика исключается на eject_seconds, а если исключены все,
+    чтение идёт в основную БД.
+    """
+
+    def __init__(self, weights, eject_seconds=30, check_seconds=5, check=None):
+        self.weights = {alias: weight for alias, weight in weights.items() if weight > 0}
+        self.eject_seconds = eject_seconds
+        self.check_seconds = check_seconds
+        self.check = check or self.ping
+        self._current = dict.fromkeys(self.weights, 0)
+        self._checked_at = {}
+        self._ejected_until = {}
+        self._lock = threading.Lock()
+        self.reads = dict.fromkeys(self.weights, 0)
+        self.ejections = dict.fromkeys(self.weights, 0)
+
+    @staticmethod
+    def ping(alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def healthy(self, alias, now):
+        with self._lock:
+            if self._ejected_until.get(alias, 0) > now:
+                return False
+            if now - self._checked_at.get(alias, float('-inf')) < self.check_seconds:
+                return True
+            self._checked_at[alias] = now
+
+        try:
+            self.check(alias)
+        except DatabaseError:
+            self.eject(alias, now)
+            return False
+        return True
+
+    def eject(self, alias, now=None):
+        with self._lock:
+            self._ejected_until[alias] = (now or time.monotonic()) + self.eject_seconds
+            self._checked_at.pop(alias, None)
+            self.ejections[alias] += 1
+
+    def choose(self):
+        """Alias реплики для чтения или None, если исправных реплик нет."""
+        now = time.monotonic()
+        candidates = dict(self.weights)
+        while candidates:
+            with self._lock:
+                total = sum(candidates.values())
+                for alias, weight in candidates.items():
+                    self._current[alias] += weight
+                alias = max(candidates, key=self._current.get)
+                self._current[alias] -= total
+            if self.healthy(alias, now):
+                with self._lock:
+                    self.reads[alias] += 1
+                return alias
+            del candidates[alias]
+        return None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                alias: {
+                    'weight': weight,
+                    'ejected': self._ejected_until.get(alias, 0) > now,
+                    'reads': self.reads[alias],
+                    'ejections': self.ejections[alias],
+                }
+                for alias, weight in self.weights.items()
+            }
+
+
+def _build_replica_pool():
+    options = getattr(settings, 'DATABASE_REPLICAS', {})
+    return ReplicaPool(
+        weights=options.get('WEIGHTS', {}),
+        eject_seconds=options.get('EJECT_SECONDS', 30),
+        check_seconds=options.get('CHECK_SECONDS', 5),
+    )
+
+
+replica_pool = _build_replica_pool()
+
+
+class ReplicaRouter:
+    """Чтение с реплики, если его разрешил ReplicaRoutingMiddleware, всё остальное — в основную БД."""
+
+    def db_for_read(self, model, **hints):
+        if not replica_reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        chosen = request_replica.get()
+        if chosen is None:
+            return replica_pool.choose()
+        # Django спрашивает роутер несколько раз на запрос к БД; одна реплика на весь
+        # HTTP-запрос сохраняет веса и согласованность чтений
+        if not chosen:
+            chosen.append(replica_pool.choose())
+        return chosen[0]
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # на репликах те же данные, что и в основной БД
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема попадает на реплики репликацией, миграции — только в основную БД
+        return db == DEFAULT_DB_ALIAS
+
+
+def client_key(credentials):
+    """Ключ кэша для хэша заголовка Authorization или cookie сессии; None для анонимного клиента."""
+    if not credentials:
+        return None
+    return 'replica-sticky:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def _request_credentials(request):
+    return request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+
+
+def _sticky_cache():
+    return caches[settings.DATABASE_REPLICAS.get('CACHE_ALIAS', 'default')]
+
+
+def _is_sticky(key):
+    """Клиент недавно писал и должен читать с основной БД."""
+    return key is not None and bool(_sticky_cache().get(key))
+
+
+def _mark_sticky(key, response):
+    # после входа клиент придёт уже с новой cookie сессии
+    session = response.cookies.get(settings.SESSION_COOKIE_NAME)
+    for sticky_key in {key, client_key(session.value if session else None)} - {None}:
+        _sticky_cache().set(sticky_key, True, settings.DATABASE_REPLICAS.get('STICKY_SECONDS', 5))
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплик для запросов с безопасным методом, кроме недавно писавших клиентов.
+
+    Под ASGI работает в цикле событий: replica_reads ставится в контексте
+    корутины и вместе с ним попадает в потоки, где выполняются запросы к БД.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # как в MiddlewareMixin: обработчик Django будет ждать __call__ как корутину
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not replica_pool.weights:
+            return self.get_response(request)
+
+        key = client_key(_request_credentials(request))
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            _mark_sticky(key, response)
+            return response
+
+        token = replica_reads.set(not _is_sticky(key))
+        chosen = request_replica.set([])
+        try:
+            return self.get_response(request)
+        finally:
+            request_replica.reset(chosen)
+            replica_reads.reset(token)
+
+    async def __acall__(self, request):
+        if not replica_pool.weights:
+            return await self.get_response(request)
+
+        key = client_key(_request_credentials(request))
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            await sync_to_async(_mark_sticky)(key, response)
+            return response
+
+        # кэш синхронный: обращение к нему не должно блокировать цикл событий
+        token = replica_reads.set(not await sync_to_async(_is_sticky)(key))
+        chosen = request_replica.set([])
+        try:
+            return await self.get_response(request)
+        finally:
+            request_replica.reset(chosen)
+            replica_reads.reset(token)
+
@@ -0,0 +1,140 @@
+"""Потоковая выгрузка заказов и отзывов в NDJSON и CSV.
+
+Строки читаются итератором по серверному курсору пачками по CHUNK_SIZE,
+позиции заказов — одним запросом на пачку, поэтому память не зависит от
+размера выгрузки.
+"""
+import csv
+import json
+from collections import defaultdict
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework import serializers
+from rest_framework.renderers import BaseRenderer
+
+from .models import Position
+
+CHUNK_SIZE = 2000
+
+# начало ячейки, с которого табличные редакторы читают формулу
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+_datetime = serializers.DateTimeField()
+_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class _ExportRenderer(BaseRenderer):
+    """Нужен для выбора формата через ?format=; данные выгрузки пишет StreamingHttpResponse,
+    а сюда попадают только ответы с ошибками."""
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class NDJSONRenderer(_ExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+
+class CSVRenderer(_ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def order_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Заказы с позициями, по chunk_size заказов за раз."""
+    orders = (
+        queryset.select_related(None).prefetch_related(None).order_by('id')
+        .values_list('id', 'creator_id', 'status', 'total', 'created_at', 'updated_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    for chunk in _chunks(orders, chunk_size):
+        positions = defaultdict(list)
+        for order_id, product_id, amount in (
+                Position.objects.filter(order_id__in=[order[0] for order in chunk])
+                .order_by('order_id', 'product_id')
+                .values_list('order_id', 'product_id', 'amount')):
+            positions[order_id].append({'product_id': product_id, 'amount': amount})
+
+        for order_id, creator_id, status, total, created_at, updated_at in chunk:
+            yield {
+                'id': order_id,
+                'creator': creator_id,
+                'status': status,
+                'total': _total.to_representation(total),
+                'created_at': _datetime.to_representation(created_at),
+                'updated_at': _datetime.to_representation(updated_at),
+                'positions': positions[order_id],
+            }
+
+
+def review_rows(queryset, chunk_size=CHUNK_SIZE):
+    reviews = (
+        queryset.select_related(None).prefetch_related(None).order_by('id')
+        .values_list('id', 'creator_id', 'product_id', 'stars', 'text', 'created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    for review_id, creator_id, product_id, stars, text, created_at in reviews:
+        yield {
+            'id': review_id,
+            'creator': creator_id,
+            'product_id': product_id,
+            'stars': stars,
+            'text': text,
+            'created_at': _datetime.to_representation(created_at),
+        }
+
+
+class _Echo:
+    """Файлоподобный объект для csv.writer, который просто возвращает строку."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        # позиции заказа в одной ячейке: product_id:amount;product_id:amount
+        return ';'.join(f"{item['product_id']}:{item['amount']}" for item in value)
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        # иначе Excel и LibreOffice выполнят текст отзыва как формулу
+        return "'" + value
+    return value
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def _csv_lines(rows, columns):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[column]) for column in columns])
+
+
+def export_response(request, rows, columns, name, chunk_size=CHUNK_SIZE):
+    """StreamingHttpResponse в формате, выбранном через ?format=ndjson|csv."""
+    renderer = request.accepted_renderer
+    if renderer.format == 'csv':
+        lines = _csv_lines(rows, columns)
+    else:
+        lines = _ndjson_lines(rows)
+
+    # строки склеиваются пачками, чтобы не писать в сокет по одной
+    content = (''.join(chunk).encode(renderer.charset) for chunk in _chunks(lines, chunk_size))
+    response = StreamingHttpResponse(content, content_type=f'{renderer.media_type}; charset={renderer.charset}')
+    response['Content-Disposition'] = f'attachment; filename="{name}.{renderer.format}"'
+    return response
@@ -1,16 +1,21 @@
 from django_filters import rest_framework as filters
 from .models import Order, Product, ProductReview, OrderStatusChoices
+from .search import search_products
 
 
 class ProductFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name="name", lookup_expr="contains")
-    description = filters.CharFilter(field_name="description", lookup_expr="contains")
+    search = filters.CharFilter(method="filter_search")
     price_from = filters.NumberFilter(field_name="price", lookup_expr="gte")
     price_to = filters.NumberFilter(field_name="price", lookup_expr="lte")
+    rating_from = filters.NumberFilter(field_name="rating_avg", lookup_expr="gte")
+    ordering = filters.OrderingFilter(fields=('price', 'rating_avg', 'review_count', 'created_at'))
 
     class Meta:
         model = Product
-        fields = ('price', 'name', 'description')
+        fields = ('price', 'name')
+
+    def filter_search(self, queryset, name, value):
+        return search_products(queryset, value)
 
 
 class ProductReviewFilter(filters.FilterSet):
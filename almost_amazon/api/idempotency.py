@@ -0,0 +1,86 @@
+"""Повтор ответа для запросов с заголовком Idempotency-Key.
+
+Первый запрос с ключом выполняется вместе с вставкой строки IdempotencyKey
+в одной транзакции, и ответ сохраняется в ней же. Параллельный запрос с тем
+же ключом ждёт на уникальном индексе (user, key) и получает сохранённый
+ответ, а повторы после этого обходятся одним поиском по индексу.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.status import HTTP_409_CONFLICT, HTTP_422_UNPROCESSABLE_ENTITY
+
+from .models import IdempotencyKey
+from .renderers import FastJSONRenderer
+
+HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+
+def expired_before():
+    return timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response({'detail': 'Ключ Idempotency-Key уже использован для другого запроса'},
+                        status=HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status_code is None:
+        return Response({'detail': 'Запрос с этим Idempotency-Key ещё выполняется'}, status=HTTP_409_CONFLICT)
+
+    response = HttpResponse(record.response_body, status=record.status_code, content_type='application/json')
+    response[REPLAY_HEADER] = 'true'
+    return response
+
+
+def idempotent(method):
+    """Сохраняет успешный ответ действия ViewSet по Idempotency-Key и повторяет его для повторных запросов."""
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            raise serializers.ValidationError({HEADER: ['Не длиннее 255 символов']})
+
+        fingerprint = _fingerprint(request)
+        record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+        if record is not None:
+            if record.created_at >= expired_before():
+                return _replay(record, fingerprint)
+            record.delete()
+
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(user=request.user, key=key, fingerprint=fingerprint)
+            except IntegrityError:
+                # ключ только что сохранил параллельный запрос
+                return _replay(IdempotencyKey.objects.get(user=request.user, key=key), fingerprint)
+
+            response = method(self, request, *args, **kwargs)
+            if not 200 <= response.status_code < 300:
+                # ошибку клиент исправит и повторит запрос с тем же ключом
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response_body = FastJSONRenderer().render(response.data).decode()
+            record.save(update_fields=['status_code', 'response_body'])
+        return response
+
+    return wrapper
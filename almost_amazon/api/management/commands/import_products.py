@@ -0,0 +1,161 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from api.cache import bump_model_version
+from api.models import Product
+from api.serializers import ProductSerializer
+
+FIELDS = ('name', 'description', 'price')
+
+COPY_SQL = {
+    'drop': "DROP TABLE IF EXISTS import_products_tmp",
+    'create': """
+        CREATE TEMP TABLE import_products_tmp (
+            external_id varchar(64), name varchar(256), description text, price numeric(10, 2)
+        ) ON COMMIT DROP
+    """,
+    'copy': "COPY import_products_tmp (external_id, name, description, price) FROM STDIN WITH (FORMAT csv)",
+    'upsert': """
+        INSERT INTO api_product
+            (external_id, name, description, price, rating_avg, review_count, created_at, updated_at)
+        SELECT external_id, name, description, price, 0, 0, %(now)s, %(now)s FROM import_products_tmp
+        ON CONFLICT (external_id) DO UPDATE SET
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            updated_at = EXCLUDED.updated_at
+    """,
+}
+
+
+class Command(BaseCommand):
+    help = 'Загружает товары из CSV или JSONL пачками с обновлением по external_id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл с колонками external_id, name, description, price')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='по умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--no-copy', action='store_true', help='не использовать COPY на PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        write_batch = self.copy_batch if use_copy else self.bulk_batch
+        self.serializer = ProductSerializer()
+        self.skipped = 0
+
+        started = time.monotonic()
+        written = 0
+        try:
+            with open(path, newline='', encoding='utf-8') as source:
+                rows = self.read_rows(source, file_format)
+                while True:
+                    batch = self.validate_batch(islice(rows, options['batch_size']))
+                    if batch is None:
+                        break
+                    if batch:
+                        with transaction.atomic():
+                            write_batch(batch)
+                        written += len(batch)
+                        self.report(written, started)
+        except OSError as exc:
+            raise CommandError(exc)
+
+        if written:
+            bump_model_version(Product)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано товаров: {written}, пропущено строк: {self.skipped}, '
+            f'{elapsed:.1f} с, {written / elapsed if elapsed else 0:.0f} строк/с'
+        ))
+
+    def read_rows(self, source, file_format):
+        """Строки файла как dict, по одной, без чтения файла целиком."""
+        if file_format == 'csv':
+            for row in csv.DictReader(source):
+                yield row
+        else:
+            for line in source:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None
+
+    def validate_batch(self, rows):
+        """Проверяет строки правилами ProductSerializer; None — если строки закончились."""
+        batch = {}
+        seen = False
+        for row in rows:
+            seen = True
+            try:
+                external_id, values = self.validate_row(row)
+            except serializers.ValidationError as exc:
+                self.skipped += 1
+                if self.skipped <= 20:
+                    self.stderr.write(f'Пропущена строка {row}: {exc.detail}')
+                continue
+            # повтор внешнего кода в пачке — побеждает последняя строка
+            batch[external_id] = values
+        return batch if seen else None
+
+    def validate_row(self, row):
+        if not isinstance(row, dict):
+            raise serializers.ValidationError('некорректная строка')
+        external_id = (row.get('external_id') or '').strip()
+        if not external_id or len(external_id) > 64:
+            raise serializers.ValidationError({'external_id': 'нужен непустой код до 64 символов'})
+
+        fields = self.serializer.fields
+        price = fields['price'].run_validation(row.get('price'))
+        description = row.get('description') or ''
+        values = {
+            'name': fields['name'].run_validation(row.get('name')),
+            'description': fields['description'].run_validation(description) if description else '',
+            'price': self.serializer.validate_price(price),
+        }
+        return external_id, values
+
+    def bulk_batch(self, batch):
+        now = timezone.now()
+        existing = Product.objects.only('id', 'external_id').in_bulk(batch.keys(), field_name='external_id')
+        changed = []
+        for external_id, product in existing.items():
+            for field, value in batch[external_id].items():
+                setattr(product, field, value)
+            product.updated_at = now
+            changed.append(product)
+
+        Product.objects.bulk_update(changed, FIELDS + ('updated_at',), batch_size=1000)
+        Product.objects.bulk_create(
+            [Product(external_id=external_id, **values)
+             for external_id, values in batch.items() if external_id not in existing],
+            batch_size=1000,
+        )
+
+    def copy_batch(self, batch):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for external_id, values in batch.items():
+            writer.writerow([external_id, values['name'], values['description'], values['price']])
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            cursor.execute(COPY_SQL['drop'])
+            cursor.execute(COPY_SQL['create'])
+            cursor.copy_expert(COPY_SQL['copy'], buffer)
+            cursor.execute(COPY_SQL['upsert'], {'now': timezone.now()})
+
+    def report(self, written, started):
+        elapsed = time.monotonic() - started
+        if elapsed:
+            self.stdout.write(f'{written} строк, {written / elapsed:.0f} строк/с')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import expired_before
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Удаляет сохранённые ответы Idempotency-Key старше IDEMPOTENCY_KEY_TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='строк в одном DELETE')
+
+    def handle(self, *args, **options):
+        before = expired_before()
+        deleted = 0
+        while True:
+            # пачками по индексу created_at, чтобы не держать длинную блокировку
+            ids = list(IdempotencyKey.objects.filter(created_at__lt=before)
+                       .values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'Удалено ключей: {deleted}'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api.cache import bump_model_version
+from api.models import Product, ProductReview
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает rating_avg и review_count всех товаров по отзывам'
+
+    def handle(self, *args, **options):
+        reviews = ProductReview.objects.filter(product_id=OuterRef('pk')).order_by().values('product_id')
+        with transaction.atomic():
+            updated = Product.objects.update(
+                review_count=Coalesce(Subquery(reviews.annotate(c=Count('id')).values('c')), Value(0)),
+                rating_avg=Coalesce(Subquery(reviews.annotate(a=Avg('stars')).values('a')), Value(0.0)),
+            )
+        bump_model_version(Product)
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны рейтинги товаров: {updated}'))
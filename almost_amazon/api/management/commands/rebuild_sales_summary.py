@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.analytics import rebuild_sales_summary
+from api.models import DailyProductSales, DailySales
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки продаж DailySales и DailyProductSales по заказам'
+
+    def handle(self, *args, **options):
+        rebuild_sales_summary()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитаны сводки продаж: {DailySales.objects.count()} строк по дням и статусам, '
+            f'{DailyProductSales.objects.count()} строк по товарам'
+        ))
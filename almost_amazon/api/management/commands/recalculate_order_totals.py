@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
+
+from api.analytics import rebuild_sales_summary
+from api.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает суммы заказов по ценам в позициях, одним UPDATE на диапазон id'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50000, help='заказов в одном UPDATE')
+
+    def handle(self, *args, **options):
+        bounds = Order.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.SUCCESS('Заказов нет'))
+            return
+
+        batch_size = options['batch_size']
+        updated = 0
+        # короткие транзакции по диапазонам id не держат блокировки на всю таблицу
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                updated += Order.objects.filter(id__gte=start, id__lt=start + batch_size).recalculate_totals()
+            self.stdout.write(f'{updated} заказов')
+
+        # суммы менялись в обход OrderSerializer, выручка в сводках устарела
+        rebuild_sales_summary()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитаны суммы заказов: {updated} и сводки продаж'))
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger('api.sql')
+
+# регистратор запросов текущего запроса; вместе с контекстом попадает в потоки sync_to_async и db_executor
+current_recorder = ContextVar('current_recorder', default=None)
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def normalize_sql(sql):
+    """SQL без различий в длине IN (...) и числовых литералах (LIMIT, OFFSET)."""
+    return _NUMBER.sub('?', _IN_LIST.sub('IN (...)', sql))
+
+
+class QueryRecorder:
+    """execute_wrapper, который считает запросы и их время по тексту SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # sql -> [число выполнений, суммарное время, самое долгое выполнение]
+        self.statements = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            stat = self.statements[sql]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+
+    def slowest(self, limit):
+        top = sorted(self.statements.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+        return [{'sql': sql, 'ms': round(stat[2] * 1000, 2), 'count': stat[0]} for sql, stat in top]
+
+    def repeated(self, threshold):
+        """Одинаковые после нормализации запросы, выполненные больше threshold раз, — признак N+1."""
+        counts = Counter()
+        for sql, stat in self.statements.items():
+            counts[normalize_sql(sql)] += stat[0]
+        return [{'sql': sql, 'count': count} for sql, count in counts.most_common() if count > threshold]
+
+
+def _record(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def instrument_connection(sender=None, connection=None, **kwargs):
+    """Обработчик connection_created: передаёт запросы соединения регистратору текущего запроса."""
+    if _record not in connection.execute_wrappers:
+        # первым, чтобы не мешать execute_wrapper(), которые снимают обёртку через pop()
+        connection.execute_wrappers.insert(0, _record)
+
+
+class SQLStats:
+    """Счётчики инструментирования SQL текущего процесса для MetricsViewSet."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def add(self, **values):
+        with self._lock:
+            self._counters.update(values)
+
+    def stats(self):
+        with self._lock:
+            return {key: self._counters[key] for key in ('sampled_requests', 'queries', 'slow_requests',
+                                                         'n_plus_one_requests')}
+
+
+sql_stats = SQLStats()
+
+
+class QueryInstrumentationMiddleware:
+    """Число запросов, время SQL и самые долгие запросы для доли запросов SQL_INSTRUMENTATION['SAMPLE_RATE'].
+
+    Добавляет заголовок Server-Timing, пишет в лог api.sql строку JSON для
+    медленных запросов и для повторов одного и того же SQL (N+1). Работает
+    и под ASGI без перехода в синхронный поток; запросы async-представлений
+    из пула db_executor учитываются. Запросы при отдаче StreamingHttpResponse
+    выполняются после ответа middleware и не учитываются.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # как в MiddlewareMixin: обработчик Django будет ждать __call__ как корутину
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        options = settings.SQL_INSTRUMENTATION
+        if not self.sampled(options):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.report(request, response, recorder, time.perf_counter() - started, options)
+        return response
+
+    async def __acall__(self, request):
+        options = settings.SQL_INSTRUMENTATION
+        if not self.sampled(options):
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.report(request, response, recorder, time.perf_counter() - started, options)
+        return response
+
+    @staticmethod
+    def sampled(options):
+        return options['SAMPLE_RATE'] >= 1 or random.random() < options['SAMPLE_RATE']
+
+    def report(self, request, response, recorder, duration, options):
+        if options['SERVER_TIMING']:
+            timing = f'db;dur={recorder.duration * 1000:.2f};desc="{recorder.count} queries", ' \
+                     f'app;dur={duration * 1000:.2f}'
+            if response.has_header('Server-Timing'):
+                timing = response['Server-Timing'] + ', ' + timing
+            response['Server-Timing'] = timing
+
+        slow = duration * 1000 >= options['SLOW_REQUEST_MS']
+        repeated = recorder.repeated(options['N_PLUS_ONE_THRESHOLD'])
+        sql_stats.add(sampled_requests=1, queries=recorder.count,
+                      slow_requests=int(slow), n_plus_one_requests=int(bool(repeated)))
+        if slow or repeated:
+            self.log(request, response, recorder, duration, slow, repeated, options)
+
+    def log(self, request, response, recorder, duration, slow, repeated, options):
+        event = {
+            'event': 'slow_request' if slow else 'n_plus_one',
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'db_ms': round(recorder.duration * 1000, 2),
+            'queries': recorder.count,
+            'slowest': recorder.slowest(options['SLOWEST_QUERIES']),
+            'n_plus_one': repeated,
+        }
+        logger.warning(json.dumps(event, ensure_ascii=False))
@@ -0,0 +1,23 @@
+# Generated by Django 3.1.2 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.FloatField(default=0, verbose_name='средняя оценка'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='количество отзывов'),
+        ),
+    ]
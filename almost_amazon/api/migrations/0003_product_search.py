@@ -0,0 +1,67 @@
+# Generated by Django 3.1.2 on 2026-10-18 10:55
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# поисковый вектор товара: название важнее описания
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}description, '')), 'B')
+"""
+
+CREATE_POSTGRES_SQL = [
+    """
+    CREATE FUNCTION api_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := %s;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """ % SEARCH_VECTOR_SQL.format(row='NEW.'),
+    """
+    CREATE TRIGGER api_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON api_product
+    FOR EACH ROW EXECUTE PROCEDURE api_product_search_vector_update()
+    """,
+    "UPDATE api_product SET search_vector = %s" % SEARCH_VECTOR_SQL.format(row=''),
+    "CREATE INDEX api_product_search_vector_gin ON api_product USING gin (search_vector)",
+]
+
+DROP_POSTGRES_SQL = [
+    "DROP INDEX IF EXISTS api_product_search_vector_gin",
+    "DROP TRIGGER IF EXISTS api_product_search_vector_trigger ON api_product",
+    "DROP FUNCTION IF EXISTS api_product_search_vector_update()",
+]
+
+
+def create_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in CREATE_POSTGRES_SQL:
+            schema_editor.execute(sql)
+    # на SQLite FTS5-таблицу и триггеры создаёт api.search.ensure_sqlite_search после migrate
+
+
+def drop_search_objects(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in DROP_POSTGRES_SQL:
+            schema_editor.execute(sql)
+    elif schema_editor.connection.vendor == 'sqlite':
+        for name in ('api_product_fts_ai', 'api_product_fts_ad', 'api_product_fts_au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        schema_editor.execute("DROP TABLE IF EXISTS api_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_product_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_objects, drop_search_objects),
+    ]
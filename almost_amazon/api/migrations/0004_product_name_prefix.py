@@ -0,0 +1,33 @@
+from django.db import migrations
+
+# выражение совпадает с тем, что Django строит для name__istartswith на PostgreSQL,
+# text_pattern_ops позволяет использовать индекс для LIKE 'abc%' при любой локали
+CREATE_POSTGRES_SQL = (
+    "CREATE INDEX api_product_name_prefix ON api_product (UPPER(name::text) text_pattern_ops)"
+)
+
+DROP_POSTGRES_SQL = "DROP INDEX IF EXISTS api_product_name_prefix"
+
+
+def create_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_POSTGRES_SQL)
+    # на SQLite индекс создаёт api.search.ensure_sqlite_search после migrate
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_POSTGRES_SQL)
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP INDEX IF EXISTS api_product_name_nocase")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_product_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
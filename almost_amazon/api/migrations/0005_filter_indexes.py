@@ -0,0 +1,45 @@
+# Generated by Django 3.1.2 on 2026-10-18 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_product_name_prefix'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['creator', 'created_at'], name='api_order_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='api_order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='api_order_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['total'], name='api_order_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(status__in=['NEW', 'IN_PROGRESS']), fields=['created_at'], name='api_order_open_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price'], name='api_product_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['product_id', 'created_at'], name='api_review_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productreview',
+            index=models.Index(fields=['created_at', 'id'], name='api_review_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.2 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='external_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True, verbose_name='внешний код'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.1.2 on 2026-10-18 11:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_product_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='день')),
+                ('status', models.TextField(choices=[('NEW', 'Создан'), ('IN_PROGRESS', 'Обработка'), ('DONE', 'Завершён')], verbose_name='статус')),
+                ('orders', models.IntegerField(default=0, verbose_name='количество заказов')),
+                ('units', models.IntegerField(default=0, verbose_name='продано единиц')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='выручка')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily sales',
+                'unique_together': {('date', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='день')),
+                ('units', models.IntegerField(default=0, verbose_name='продано единиц')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='выручка')),
+                ('product_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='api.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily product sales',
+                'unique_together': {('date', 'product_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.2 on 2026-10-18 11:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_unit_price(apps, schema_editor):
+    # для уже сделанных заказов другой цены, кроме текущей, нет
+    Position = apps.get_model('api', 'Position')
+    Product = apps.get_model('api', 'Product')
+    Position.objects.update(unit_price=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_sales_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='position',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=10, verbose_name='цена за единицу'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_unit_price, migrations.RunPython.noop),
+    ]
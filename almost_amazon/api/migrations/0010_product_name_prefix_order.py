@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# выражение совпадает с api.search.NameKey: с COLLATE "C" обычный btree-индекс
+# годится и для LIKE 'ABC%', и для ORDER BY без сортировки, id — для порядка среди равных названий
+CREATE_POSTGRES_SQL = (
+    'CREATE INDEX api_product_name_prefix ON api_product ((UPPER(name::text) COLLATE "C"), id)'
+)
+
+OLD_POSTGRES_SQL = (
+    "CREATE INDEX api_product_name_prefix ON api_product (UPPER(name::text) text_pattern_ops)"
+)
+
+DROP_POSTGRES_SQL = "DROP INDEX IF EXISTS api_product_name_prefix"
+
+
+def replace_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_POSTGRES_SQL)
+        schema_editor.execute(CREATE_POSTGRES_SQL)
+
+
+def restore_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_POSTGRES_SQL)
+        schema_editor.execute(OLD_POSTGRES_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(replace_prefix_index, restore_prefix_index),
+    ]
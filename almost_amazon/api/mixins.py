@@ -0,0 +1,126 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .values import compile_values_serializer
+
+
+def _lookup_root(lookup):
+    path = lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup
+    return path.split(LOOKUP_SEP)[0]
+
+
+def _only_fields(model, fields):
+    """Колонки модели для полей сериализатора или None, если поле не описать колонкой."""
+    columns = {model._meta.pk.name}
+    for field in fields:
+        if field.source == '*':
+            return None
+        try:
+            model_field = model._meta.get_field(field.source.split('.')[0])
+        except FieldDoesNotExist:
+            return None
+        if model_field.concrete and not model_field.many_to_many:
+            columns.add(model_field.name)
+    return columns
+
+
+class EagerLoadingMixin:
+    """Подгружает связанные данные, нужные сериализатору, через get_queryset.
+
+    ViewSet объявляет select_related_fields и prefetch_related_fields,
+    и list/retrieve выполняют постоянное число запросов вместо N+1.
+    Для list и retrieve подгружаются только связи полей, оставшихся после
+    ?fields=, поля из ?expand= добавляются к select_related и prefetch_related,
+    а колонки модели сужаются через only(). Колонки из permission_fields
+    читают проверки прав объекта, они загружаются всегда.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    permission_fields = ()
+    pruned_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        return self.apply_eager_loading(super().get_queryset())
+
+    def apply_eager_loading(self, queryset):
+        select_related, prefetch_related = list(self.select_related_fields), list(self.prefetch_related_fields)
+        columns = None
+        if self.action in self.pruned_actions:
+            serializer = self.get_serializer()
+            fields = [field for field in serializer.fields.values() if not field.write_only]
+            expanded = [serializer.fields[name] for name in getattr(serializer, 'expanded_fields', ())]
+            roots = {field.source.split('.')[0] for field in fields} - {field.source for field in expanded}
+            select_related = [lookup for lookup in select_related if _lookup_root(lookup) in roots]
+            prefetch_related = [lookup for lookup in prefetch_related if _lookup_root(lookup) in roots]
+            for field in expanded:
+                if isinstance(field, serializers.ListSerializer):
+                    prefetch_related.append(field.source)
+                else:
+                    select_related.append(field.source)
+
+            columns = _only_fields(queryset.model, fields)
+            if columns is not None:
+                columns.update(self.permission_fields)
+            if columns is not None and self.paginator is not None:
+                # поля ключа пагинации читаются у последней записи страницы
+                columns.update(field.lstrip('-') for field in getattr(self.paginator, 'ordering', ()))
+
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if columns is not None:
+            queryset = queryset.only(*columns)
+        return queryset
+
+
+class CreatorScopedMixin:
+    """Оставляет в get_queryset только объекты текущего пользователя, если он не администратор.
+
+    Владение проверяется условием creator_id = request.user.id в том же
+    запросе по индексу, а не после загрузки объекта: чужие объекты не
+    попадают в список, а retrieve, update и destroy отвечают на них 404.
+    scoped_actions ограничивает действия, для которых это условие нужно.
+    """
+    creator_field = 'creator'
+    scoped_actions = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.scoped_actions is not None and self.action not in self.scoped_actions:
+            return queryset
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(**{f'{self.creator_field}_id': self.request.user.id})
+
+
+class ValuesListMixin:
+    """list через values() и заранее собранные конвертеры полей сериализатора.
+
+    Ответ тот же, что у list с сериализатором, но без создания моделей и
+    обхода полей DRF для каждой строки. Быстрый путь включается у ViewSet
+    атрибутом values_list = True; без него и если сериализатор нельзя описать
+    колонками values(), используется обычный list.
+    """
+    values_list = False
+
+    def list(self, request, *args, **kwargs):
+        values_serializer = compile_values_serializer(self.get_serializer()) if self.values_list else None
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        # поля сортировки нужны пагинатору для курсора, даже если их нет в ответе
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if self.paginator is not None:
+            ordering += list(getattr(self.paginator, 'ordering', ()))
+        extra = [field.lstrip('-') for field in ordering]
+        rows = queryset.values(*dict.fromkeys(values_serializer.columns + tuple(extra)))
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(rows))
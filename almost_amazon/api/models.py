@@ -1,5 +1,11 @@
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class OrderStatusChoices(models.TextChoices):
@@ -10,8 +16,22 @@ class OrderStatusChoices(models.TextChoices):
     DONE = "DONE", "Завершён"
 
 
+# допустимые переходы статуса заказа: новый статус -> статус, из которого в него можно перейти
+ORDER_TRANSITIONS = {
+    OrderStatusChoices.IN_PROGRESS: OrderStatusChoices.NEW,
+    OrderStatusChoices.DONE: OrderStatusChoices.IN_PROGRESS,
+}
+
+
 class Product(models.Model):
     """товар"""
+    external_id = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        verbose_name='внешний код',
+    )
     name = models.CharField(
         max_length=256,
         verbose_name='товар',
@@ -29,11 +49,29 @@ class Product(models.Model):
         verbose_name='цена'
     )
 
+    rating_avg = models.FloatField(
+        default=0,
+        verbose_name='средняя оценка',
+    )
+    review_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='количество отзывов',
+    )
+
+    # заполняется триггером БД из name и description, см. api.search
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = 'Products'
+        indexes = [
+            models.Index(fields=['price'], name='api_product_price_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name}"
@@ -68,10 +106,58 @@ class ProductReview(models.Model):
     class Meta:
         unique_together = ('creator', 'product_id')
         verbose_name_plural = 'Product reviews'
+        indexes = [
+            # отзывы к товару и листинг с пагинацией по (created_at, id)
+            models.Index(fields=['product_id', 'created_at'], name='api_review_product_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='api_review_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Отзыв на {self.product_id.name} от {self.creator}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # сохранённые товар и оценка нужны, чтобы при изменении отзыва поправить агрегаты товара
+        instance._stored_rating = (instance.__dict__.get('product_id_id'), instance.__dict__.get('stars'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # агрегаты товара обновляются в post_save, в той же транзакции
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+def positions_total():
+    """Сумма позиций по сохранённым в них ценам."""
+    return Coalesce(
+        Sum(ExpressionWrapper(F('amount') * F('unit_price'), output_field=DecimalField(max_digits=12, decimal_places=2))),
+        Value(Decimal(0)),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+
+    def recalculate_totals(self):
+        """Пересчитывает total заказов одним UPDATE по позициям."""
+        totals = (Position.objects.filter(order_id=OuterRef('pk')).order_by()
+                  .values('order_id').annotate(total=positions_total()).values('total'))
+        return self.update(total=Coalesce(Subquery(totals), Value(Decimal(0))))
+
+    def transition(self, status):
+        """Переводит заказы в status одним UPDATE по id заказов в предыдущем статусе.
+
+        id выбираются с блокировкой строк (SELECT ... FOR UPDATE), поэтому до
+        конца транзакции их статус не изменится. Возвращает число переведённых
+        заказов и queryset ровно с ними.
+        """
+        with transaction.atomic(using=self.db):
+            ids = list(self.filter(status=ORDER_TRANSITIONS[status]).select_for_update()
+                       .order_by('pk').values_list('pk', flat=True))
+            updated = self.model.objects.filter(pk__in=ids).update(status=status, updated_at=timezone.now())
+        return updated, self.model.objects.filter(pk__in=ids)
+
 
 class Order(models.Model):
     """заказ"""
@@ -99,12 +185,30 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = 'Orders'
+        indexes = [
+            # заказы клиента, фильтр по статусу и листинг с пагинацией по (created_at, id)
+            models.Index(fields=['creator', 'created_at'], name='api_order_creator_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='api_order_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='api_order_created_id_idx'),
+            models.Index(fields=['total'], name='api_order_total_idx'),
+            # незавершённые заказы — небольшая часть таблицы, которую постоянно разбирает склад
+            models.Index(
+                fields=['created_at'],
+                name='api_order_open_created_idx',
+                condition=models.Q(status__in=['NEW', 'IN_PROGRESS']),
+            ),
+        ]
 
     def __str__(self):
         return f"Создан {self.creator} {self.created_at.strftime('%c')} сумма заказа {self.total}"
 
+    def calculate_total(self):
+        return self.positions.aggregate(total=positions_total())['total']
+
 
 class Position(models.Model):
     """таблица для связи заказ - товар"""
@@ -126,6 +230,14 @@ class Position(models.Model):
         verbose_name='количество'
     )
 
+    # цена товара на момент заказа, сумма заказа считается по ней
+    unit_price = models.DecimalField(
+        blank=True,
+        max_digits=10,
+        decimal_places=2,
+        verbose_name='цена за единицу'
+    )
+
     class Meta:
         unique_together = ('order_id', 'product_id')
         verbose_name_plural = 'Positions'
@@ -133,6 +245,11 @@ class Position(models.Model):
     def __str__(self):
         return f"{self.product_id} {self.amount}"
 
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.product_id.price
+        super().save(*args, **kwargs)
+
 
 class ProductCollection(models.Model):
     """подборка продуктов от админа"""
@@ -157,3 +274,98 @@ class ProductCollection(models.Model):
 
     def __str__(self):
         return f"{self.title}"
+
+
+class DailySales(models.Model):
+    """продажи за день по статусу заказа, обновляются инкрементально, см. api.analytics"""
+    date = models.DateField(verbose_name='день')
+
+    status = models.TextField(
+        choices=OrderStatusChoices.choices,
+        verbose_name='статус'
+    )
+
+    orders = models.IntegerField(
+        default=0,
+        verbose_name='количество заказов'
+    )
+    units = models.IntegerField(
+        default=0,
+        verbose_name='продано единиц'
+    )
+    revenue = models.DecimalField(
+        default=0,
+        max_digits=16,
+        decimal_places=2,
+        verbose_name='выручка'
+    )
+
+    class Meta:
+        unique_together = ('date', 'status')
+        verbose_name_plural = 'Daily sales'
+
+    def __str__(self):
+        return f"{self.date} {self.status} {self.revenue}"
+
+
+class DailyProductSales(models.Model):
+    """продажи товара за день, обновляются инкрементально, см. api.analytics"""
+    date = models.DateField(verbose_name='день')
+
+    product_id = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        verbose_name='товар',
+        related_name='daily_sales',
+    )
+
+    units = models.IntegerField(
+        default=0,
+        verbose_name='продано единиц'
+    )
+    revenue = models.DecimalField(
+        default=0,
+        max_digits=16,
+        decimal_places=2,
+        verbose_name='выручка'
+    )
+
+    class Meta:
+        unique_together = ('date', 'product_id')
+        verbose_name_plural = 'Daily product sales'
+
+    def __str__(self):
+        return f"{self.date} {self.product_id_id} {self.revenue}"
+
+
+class IdempotencyKey(models.Model):
+    """сохранённый ответ на запрос с заголовком Idempotency-Key, см. api.idempotency"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='пользователь',
+        related_name='idempotency_keys',
+    )
+
+    key = models.CharField(
+        max_length=255,
+        verbose_name='ключ',
+    )
+
+    # хэш метода, пути и тела запроса: с тем же ключом нельзя прислать другой запрос
+    fingerprint = models.CharField(max_length=64)
+
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.TextField(default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+        verbose_name_plural = 'Idempotency keys'
+        indexes = [
+            models.Index(fields=['created_at'], name='api_idempotency_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.key}"
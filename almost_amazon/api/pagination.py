@@ -0,0 +1,154 @@
+import json
+from base64 import b64decode, b64encode
+from collections import namedtuple
+from datetime import date, datetime
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+def _reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    """Keyset-пагинация по полям ordering.
+
+    Курсор хранит значения всех полей сортировки у крайней записи страницы,
+    следующая страница выбирается условием (f1, f2) > (v1, v2) без OFFSET и
+    без COUNT(*), поэтому стоимость страницы не зависит от её номера.
+    Последнее поле ordering должно быть уникальным.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            try:
+                queryset = queryset.filter(self.get_keyset_filter(ordering, self.cursor.position))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # берём на одну запись больше, чтобы узнать, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Сортировка, заданная фильтром, дополняется ordering пагинатора для уникальности ключа."""
+        requested = tuple(queryset.query.order_by)
+        if not requested or not all(isinstance(field, str) for field in requested):
+            return super().get_ordering(request, queryset, view)
+
+        names = {field.lstrip('-') for field in requested}
+        return requested + tuple(field for field in self.ordering if field.lstrip('-') not in names)
+
+    def get_keyset_filter(self, ordering, position):
+        """Условие "строго после позиции" для составного ключа сортировки.
+
+        a > x OR (a = x AND b > y) дополняется условием a >= x: без него
+        PostgreSQL не читает индекс (a, b) диапазоном от позиции курсора.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        if len(ordering) > 1:
+            first = ordering[0]
+            lookup = 'lte' if first.startswith('-') else 'gte'
+            condition = Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+        return condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # пустая страница после удаления записей — возвращаемся в начало
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            querystring = b64decode(encoded.encode('ascii')).decode('ascii')
+            tokens = parse.parse_qs(querystring, keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = json.loads(tokens['p'][0])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': json.dumps(cursor.position)}
+        if cursor.reverse:
+            tokens['r'] = '1'
+
+        querystring = parse.urlencode(tokens, doseq=True)
+        encoded = b64encode(querystring.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif value is not None:
+                value = str(value)
+            position.append(value)
+        return position
+
+
+class ProductPagination(KeysetPagination):
+    """Пагинация товаров по id."""
+    ordering = ('id',)
+
+
+class CreatedAtPagination(KeysetPagination):
+    """Пагинация заказов, отзывов и подборок по (created_at, id)."""
+    ordering = ('created_at', 'id')
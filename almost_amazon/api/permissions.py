@@ -5,14 +5,15 @@ class CreatorOrAdminPermission(permissions.BasePermission):
     message = 'Это могут делать только создатель и администратор'
 
     def has_object_permission(self, request, view, obj):
-        return request.user == obj.creator or request.user.is_staff
+        return obj.creator_id == request.user.id or request.user.is_staff
 
 
 class OrderCreatePermission(permissions.BasePermission):
     message = 'Нельзя указывать статус заказа при создании'
 
     def has_permission(self, request, view):
-        return not request.data.get('status', False)
+        data = request.data if isinstance(request.data, list) else [request.data]
+        return not any(isinstance(entry, dict) and entry.get('status', False) for entry in data)
 
 
 class OrderUpdatePermission(permissions.BasePermission):
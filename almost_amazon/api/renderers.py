@@ -0,0 +1,71 @@
+"""JSON-рендерер и парсер на orjson с откатом на стандартный json.
+
+Если orjson не установлен, а также для случаев, где вывод orjson отличался бы
+от DRF (отступы, ensure_ascii, числа больше 64 бит), работают JSONRenderer и
+JSONParser из DRF. Decimal, datetime, date и time orjson передаёт в
+кодировщик DRF, поэтому их представление не меняется.
+"""
+import codecs
+import re
+
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+# DRF экранирует эти символы, т.к. они недопустимы в строках JavaScript
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+_LONG_NUMBER = re.compile(rb'\d{19}')
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer, который кодирует через orjson, если он установлен."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if b'\xe2\x80' in ret:
+            for char, escaped in _LINE_SEPARATORS:
+                ret = ret.replace(char, escaped)
+        return ret
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser, который разбирает тело через orjson, если он установлен."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        # целые больше 64 бит orjson превращает во float, их разбирает json
+        if not _LONG_NUMBER.search(body):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        # сообщения об ошибках — как в DRF
+        try:
+            parse_constant = json.strict_constant if self.strict else None
+            return json.loads(body.decode(encoding), parse_constant=parse_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
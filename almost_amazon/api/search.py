@@ -0,0 +1,141 @@
+"""Полнотекстовый поиск и подсказки по названиям товаров.
+
+На PostgreSQL используется хранимый search_vector с GIN-индексом, его
+заполняет триггер (миграция 0003_product_search), а для подсказок —
+индекс по (UPPER(name) COLLATE "C", id) (0010_product_name_prefix_order),
+который даёт и отбор по префиксу, и порядок выдачи без сортировки.
+На SQLite — внешняя FTS5-таблица api_product_fts с триггерами и индекс
+по name COLLATE NOCASE, которые создаются после migrate.
+"""
+import sys
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import CharField, F, FloatField, Func, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = 'russian'
+
+SQLITE_FTS_TABLE = 'api_product_fts'
+
+SQLITE_FTS_TRIGGERS = {
+    'api_product_fts_ai': """
+        CREATE TRIGGER IF NOT EXISTS api_product_fts_ai AFTER INSERT ON api_product BEGIN
+            INSERT INTO api_product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """,
+    'api_product_fts_ad': """
+        CREATE TRIGGER IF NOT EXISTS api_product_fts_ad AFTER DELETE ON api_product BEGIN
+            INSERT INTO api_product_fts(api_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    'api_product_fts_au': """
+        CREATE TRIGGER IF NOT EXISTS api_product_fts_au AFTER UPDATE OF name, description ON api_product BEGIN
+            INSERT INTO api_product_fts(api_product_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO api_product_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+SQLITE_NAME_PREFIX_INDEX = (
+    "CREATE INDEX IF NOT EXISTS api_product_name_nocase ON api_product (name COLLATE NOCASE)"
+)
+
+
+def ensure_sqlite_search(sender=None, using='default', **kwargs):
+    """Создаёт поисковые объекты на SQLite (обработчик post_migrate).
+
+    Пересоздание таблицы api_product при миграциях на SQLite удаляет её
+    триггеры и индексы, о которых не знает Django, поэтому они проверяются
+    после каждого migrate, а FTS-индекс перестраивается, если триггеры
+    пришлось создать заново.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(SQLITE_NAME_PREFIX_INDEX)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'api_product'")
+        if SQLITE_FTS_TRIGGERS.keys() <= {row[0] for row in cursor.fetchall()}:
+            return
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} "
+            "USING fts5(name, description, content='api_product', content_rowid='id')"
+        )
+        for sql in SQLITE_FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def _fts5_query(text):
+    # каждое слово берётся в кавычки, чтобы пользовательский ввод не разбирался как синтаксис FTS5
+    return ' '.join('"%s"' % word.replace('"', '""') for word in text.split())
+
+
+def search_products(queryset, text):
+    """Товары, подходящие под запрос, с аннотацией search_rank и сортировкой по релевантности."""
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        rank = Cast(SearchRank(F('search_vector'), query), FloatField())
+        queryset = queryset.filter(search_vector=query)
+    elif vendor == 'sqlite':
+        match = _fts5_query(text)
+        if not match:
+            return queryset.none()
+        rank = RawSQL(
+            f"SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = api_product.id",
+            (match,),
+            output_field=FloatField(),
+        )
+        queryset = queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s", (match,))
+        )
+    else:
+        return queryset.filter(Q(name__icontains=text) | Q(description__icontains=text))
+
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', 'id')
+
+
+class NameKey(Func):
+    """Название без учёта регистра в порядке индекса подсказок.
+
+    На PostgreSQL — UPPER(name) в побайтовом порядке COLLATE "C", как в
+    индексе api_product_name_prefix, на SQLite — name COLLATE NOCASE, как
+    в api_product_name_nocase.
+    """
+    function = 'UPPER'
+    output_field = CharField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='(%(function)s(%(expressions)s::text) COLLATE "C")',
+                           **extra_context)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, template='%(expressions)s COLLATE NOCASE', **extra_context)
+
+
+def suggest_products(queryset, prefix, limit):
+    """Первые limit товаров, название которых начинается с prefix (без учёта регистра).
+
+    Отбор и сортировка идут по одному выражению индекса, поэтому LIMIT
+    читает первые записи индекса, а не сортирует все совпадения.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        # диапазон [PREFIX, PREFIY) по самому выражению индекса: у startswith Django
+        # добавляет ::text, и выражение перестаёт совпадать с индексом
+        key = prefix.upper()
+        queryset = queryset.annotate(name_key=NameKey('name')).filter(name_key__gte=key)
+        if key and ord(key[-1]) < sys.maxunicode:
+            queryset = queryset.filter(name_key__lt=key[:-1] + chr(ord(key[-1]) + 1))
+    else:
+        queryset = queryset.filter(name__istartswith=prefix)
+    return queryset.order_by(NameKey('name').asc(), 'id').values('id', 'name')[:limit]
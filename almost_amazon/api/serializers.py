@@ -1,11 +1,48 @@
 from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from rest_framework.relations import PrimaryKeyRelatedField
 
-from .models import Order, Product, ProductReview, ProductCollection, Position
+from .analytics import order_contribution, record_sales
+from .models import ORDER_TRANSITIONS, Order, Product, ProductReview, ProductCollection, Position
 
 
-class UserSerializer(serializers.ModelSerializer):
+def _split_param(value):
+    return [name for name in (value or '').split(',') if name]
+
+
+class SparseFieldsMixin:
+    """Поля ответа по параметрам запроса ?fields= и ?expand=.
+
+    fields оставляет только перечисленные поля, expand заменяет поля из
+    Meta.expandable_fields вложенными объектами. Параметры действуют только
+    на чтение (GET, HEAD) и только на сериализатор верхнего уровня; поля,
+    которых нет в сериализаторе, пропускаются.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expanded_fields = set()
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+
+        expand = _split_param(request.query_params.get('expand'))
+        for name, (serializer_class, options) in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand and name in self.fields:
+                self.fields[name] = serializer_class(read_only=True, **options)
+                self.expanded_fields.add(name)
+
+        fields = _split_param(request.query_params.get('fields'))
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+                self.expanded_fields.discard(name)
+
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer для пользователя."""
 
     class Meta:
@@ -14,7 +51,7 @@ class UserSerializer(serializers.ModelSerializer):
                   'last_name', 'email')
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer для товара."""
     price = serializers.DecimalField(
         max_digits=10,
@@ -23,7 +60,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = ('id', 'name', 'description', 'price',)
+        fields = ('id', 'name', 'description', 'price', 'rating_avg', 'review_count',)
+        read_only_fields = ('rating_avg', 'review_count',)
 
     def validate_price(self, data):
         if data <= 0:
@@ -32,13 +70,74 @@ class ProductSerializer(serializers.ModelSerializer):
         return data
 
 
+def _product_pk(data):
+    """PK из целого числа или строки из цифр; для остального (True, 1.9, "1 ") — None."""
+    if type(data) is int:
+        return data
+    if isinstance(data, str) and data.isdigit():
+        try:
+            return int(data)
+        except ValueError:
+            return None
+    return None
+
+
+class ProductPrimaryKeyField(PrimaryKeyRelatedField):
+    """PK товара, который ищется среди заранее загруженных в context товаров."""
+
+    def to_internal_value(self, data):
+        pk = _product_pk(data)
+        if pk is None:
+            # get(pk=...) приняло бы True и 1.9 как pk 1
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        products = self.context.get('product_cache', {})
+        if pk in products:
+            return products[pk]
+        return super().to_internal_value(pk)
+
+
 class PositionSerializer(serializers.Serializer):
     """Serializer для позиции."""
-    product_id = PrimaryKeyRelatedField(queryset=Product.objects.all())
+    product_id = ProductPrimaryKeyField(queryset=Product.objects.all())
     amount = serializers.IntegerField(min_value=1, default=1)
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderListSerializer(serializers.ListSerializer):
+    """Serializer для пакетного создания заказов."""
+    max_batch_size = 500
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            if len(data) > self.max_batch_size:
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: [f"Не больше {self.max_batch_size} заказов за запрос"]
+                })
+            self.child.preload_products(data)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        creator = self.context["request"].user
+        orders, positions = [], []
+        for entry in validated_data:
+            pos = entry.pop('positions')
+            orders.append(Order(creator=creator, total=self.child.get_total(pos), **entry))
+            positions.append(pos)
+
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                Order.objects.bulk_create(orders)
+            else:
+                # без RETURNING первичные ключи заказов можно получить только построчно
+                [order.save() for order in orders]
+            positions = [self.child.build_positions(order, pos) for order, pos in zip(orders, positions)]
+            Position.objects.bulk_create([position for group in positions for position in group])
+            record_sales(after=[order_contribution(order, group) for order, group in zip(orders, positions)])
+
+        prefetch_related_objects(orders, 'positions')
+        return orders
+
+
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer для заказа."""
     creator = UserSerializer(
         read_only=True,
@@ -54,63 +153,123 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ('id', 'creator', 'positions', 'total', 'status', 'created_at', 'updated_at')
+        list_serializer_class = OrderListSerializer
+
+    def to_internal_value(self, data):
+        self.preload_products([data])
+        return super().to_internal_value(data)
+
+    def preload_products(self, entries):
+        """Загружает все товары из позиций одним запросом в context['product_cache']."""
+        products = self.context.setdefault('product_cache', {})
+        ids = set()
+        for entry in entries:
+            pos = entry.get('positions') if isinstance(entry, dict) else None
+            for item in pos if isinstance(pos, list) else []:
+                pk = _product_pk(item.get('product_id')) if isinstance(item, dict) else None
+                if pk is not None:
+                    ids.add(pk)
+
+        ids -= products.keys()
+        if ids:
+            products.update(Product.objects.in_bulk(ids))
+
+    @staticmethod
+    def get_total(pos):
+        """Сумма нового заказа по текущим ценам, которые запишутся в позиции."""
+        return sum(entry['product_id'].price * entry.get('amount', 1) for entry in pos)
+
+    @staticmethod
+    def build_positions(order, pos):
+        return [
+            Position(order_id=order, product_id=entry['product_id'], amount=entry.get('amount', 1),
+                     unit_price=entry['product_id'].price)
+            for entry in pos
+        ]
 
     def create(self, validated_data):
         validated_data["creator"] = self.context["request"].user
         pos = validated_data.pop('positions')
-        prods = [{'p': entry.get('product_id'), 'a': entry.get('amount')} for entry in pos]
-
-        total = 0  # вычисление общей цены
-        for item in prods:
-            total += item['p'].price * item['a']
-
-        validated_data["total"] = total
-
-        order = super().create(validated_data)
-        [
-            Position.objects.create(
-                order_id=order,
-                product_id=item['p'],
-                amount=item['a']
-            )
-            for item in prods
-        ]
+        validated_data["total"] = self.get_total(pos)
+
+        with transaction.atomic():
+            order = super().create(validated_data)
+            positions = self.build_positions(order, pos)
+            Position.objects.bulk_create(positions)
+            record_sales(after=[order_contribution(order, positions)])
         return order
 
     def update(self, instance, validated_data):
         pos = validated_data.pop('positions', False)
-        if pos:
-            prods = [{'p': entry.get('product_id'), 'a': entry.get('amount', 1)} for entry in pos]
-
-            total = 0  # пересчёт общей цены
-            for item in prods:
-                total += item['p'].price * item['a']
-
-            validated_data["total"] = total
-
-            [old_pos.delete() for old_pos in instance.positions.all()]
-            # не знаю, как тут лучше поступить. Удалил всё что было и заново создал новые связи
-
-            [
-                Position.objects.create(
-                    order_id=instance,
-                    product_id=item['p'],
-                    amount=item['a']
-                )
-                for item in prods
-            ]
-
-        instance = super().update(instance, validated_data)
+        with transaction.atomic():
+            # без блокировки параллельное изменение заказа попало бы в сводки дважды или потерялось
+            instance = Order.objects.select_for_update().get(pk=instance.pk)
+            status = validated_data.get('status', instance.status)
+            if status != instance.status and ORDER_TRANSITIONS.get(status) != instance.status:
+                raise serializers.ValidationError(
+                    {'status': f'Нельзя перевести заказ из статуса {instance.status} в {status}'})
+            positions = list(instance.positions.all())
+            before = order_contribution(instance, positions)
+            if pos:
+                positions = self.update_positions(instance, pos)
+                validated_data["total"] = instance.calculate_total()
+
+            instance = super().update(instance, validated_data)
+            record_sales(before=[before], after=[order_contribution(instance, positions)])
         return instance
 
+    def update_positions(self, order, pos):
+        """Сравнивает новые позиции с сохранёнными и записывает только разницу.
+
+        У оставшихся позиций сохраняется цена на момент заказа, новые получают текущую.
+        """
+        stored = {position.product_id_id: position for position in order.positions.all()}
+        incoming = {entry['product_id'].pk: entry for entry in pos}
+
+        changed = []
+        for product_pk, entry in incoming.items():
+            position = stored.get(product_pk)
+            if position is not None and position.amount != entry.get('amount', 1):
+                position.amount = entry.get('amount', 1)
+                changed.append(position)
+        added = [entry for product_pk, entry in incoming.items() if product_pk not in stored]
+        removed = stored.keys() - incoming.keys()
+
+        if removed:
+            Position.objects.filter(order_id=order, product_id__in=removed).delete()
+        if changed:
+            Position.objects.bulk_update(changed, ['amount'])
+        added = self.build_positions(order, added)
+        if added:
+            Position.objects.bulk_create(added)
+        return [stored[product_pk] for product_pk in incoming if product_pk in stored] + added
+
     def validate_positions(self, data):
         if not data:
             raise serializers.ValidationError("Заказ не может быть пустым")
 
+        ids = [entry['product_id'].pk for entry in data]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Товар не может повторяться в заказе")
+
         return data
 
 
-class ProductReviewSerializer(serializers.ModelSerializer):
+class OrderTransitionSerializer(serializers.Serializer):
+    """Serializer для перехода заказа в следующий статус."""
+    status = serializers.ChoiceField(choices=list(ORDER_TRANSITIONS))
+
+
+class OrderBulkTransitionSerializer(OrderTransitionSerializer):
+    """Serializer для перехода пачки заказов в следующий статус."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=10000,
+    )
+
+
+class ProductReviewSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer для отзыва."""
     creator = UserSerializer(
         read_only=True,
@@ -127,6 +286,7 @@ class ProductReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductReview
         fields = ('id', 'creator', 'product_id', 'text', 'stars', 'created_at')
+        expandable_fields = {'product_id': (ProductSerializer, {})}
 
     def create(self, validated_data):
         validated_data["creator"] = self.context["request"].user
@@ -138,9 +298,33 @@ class ProductReviewSerializer(serializers.ModelSerializer):
         return value
 
 
-class ProductCollectionSerializer(serializers.ModelSerializer):
+class ProductCollectionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer для подборки."""
 
     class Meta:
         model = ProductCollection
         fields = ('id', 'title', 'text', 'collection_items', 'created_at')
+        expandable_fields = {'collection_items': (ProductSerializer, {'many': True})}
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    """Параметры отчёта о продажах."""
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=500, default=20)
+
+    def validate(self, data):
+        if data.get('date_from') and data.get('date_to') and data['date_from'] > data['date_to']:
+            raise serializers.ValidationError("Начало периода не может быть позже конца")
+        return data
+
+
+class SalesReportRowSerializer(serializers.Serializer):
+    """Строка отчёта о продажах: по дню, статусу или товару."""
+    date = serializers.DateField(required=False)
+    status = serializers.CharField(required=False)
+    product_id = serializers.IntegerField(required=False)
+    name = serializers.CharField(required=False)
+    orders = serializers.IntegerField(required=False)
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=16, decimal_places=2)
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .analytics import order_contribution, record_sales, schedule_rebuild
+from .authentication import token_cache
+from .cache import bump_model_version
+from .models import Order, Position, Product, ProductCollection, ProductReview
+
+
+def update_product_rating(product_pk, count_delta, stars_delta):
+    """Инкрементально пересчитывает rating_avg и review_count товара одним UPDATE."""
+    Product.objects.filter(pk=product_pk).update(
+        review_count=F('review_count') + count_delta,
+        rating_avg=Case(
+            When(review_count__lte=-count_delta, then=Value(0.0)),
+            default=ExpressionWrapper(
+                (F('rating_avg') * F('review_count') + stars_delta) / (F('review_count') + count_delta),
+                output_field=FloatField(),
+            ),
+            output_field=FloatField(),
+        ),
+    )
+    bump_model_version(Product)
+
+
+@receiver(post_save, sender=ProductReview)
+def review_saved(sender, instance, created, **kwargs):
+    stored_product, stored_stars = getattr(instance, '_stored_rating', (None, None))
+    if created:
+        update_product_rating(instance.product_id_id, 1, instance.stars)
+    elif stored_product is not None and stored_stars is not None:
+        # если прежние значения неизвестны, агрегаты поправит rebuild_product_ratings
+        if stored_product != instance.product_id_id:
+            update_product_rating(stored_product, -1, -stored_stars)
+            update_product_rating(instance.product_id_id, 1, instance.stars)
+        elif stored_stars != instance.stars:
+            update_product_rating(instance.product_id_id, 0, instance.stars - stored_stars)
+
+    instance._stored_rating = (instance.product_id_id, instance.stars)
+
+
+@receiver(post_delete, sender=ProductReview)
+def review_deleted(sender, instance, **kwargs):
+    product_pk, stars = getattr(instance, '_stored_rating', (None, None))
+    update_product_rating(product_pk or instance.product_id_id, -1, -(stars if stars is not None else instance.stars))
+
+
+def _evict_now_and_on_commit(evict):
+    # как bump_model_version: параллельный запрос до коммита мог снова положить в кэш старые данные
+    evict()
+    transaction.on_commit(evict)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    def evict():
+        token_cache.delete(instance.key)
+        # смена версии пользователя сбрасывает токен и в памяти других процессов
+        token_cache.delete_user(instance.user_id)
+
+    _evict_now_and_on_commit(evict)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, **kwargs):
+    # деактивация, смена прав и т.п. — пользователь из кэша больше не актуален
+    user_pk = instance.pk
+    _evict_now_and_on_commit(lambda: token_cache.delete_user(user_pk))
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCollection)
+@receiver(post_delete, sender=ProductCollection)
+def catalog_changed(sender, **kwargs):
+    bump_model_version(sender)
+
+
+@receiver(m2m_changed, sender=ProductCollection.collection_items.through)
+def collection_items_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_model_version(ProductCollection)
+
+
+@receiver(pre_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    # позиции ещё не удалены каскадом, вклад заказа в сводки можно посчитать
+    record_sales(before=[order_contribution(instance, Position.objects.filter(order_id=instance))])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    # позиции товара удалены каскадом, их вклад в сводки по дням надо вычесть
+    schedule_rebuild()
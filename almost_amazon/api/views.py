@@ -1,20 +1,57 @@
+from django.db import transaction
+from django.db.models import Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
-
+from rest_framework.status import HTTP_201_CREATED, HTTP_409_CONFLICT
+from rest_framework.viewsets import ModelViewSet, ViewSet
+
+from .analytics import record_transition, sales_report
+from .authentication import token_cache
+from .cache import CachedResponseMixin, cache_response
+from .db_pool.pool import pool_stats
+from .db_router import replica_pool
+from .export import CSVRenderer, NDJSONRenderer, export_response, order_rows, review_rows
 from .filters import ProductFilter, ProductReviewFilter, OrderFilter
-from .models import Order, Product, ProductReview, ProductCollection
+from .idempotency import idempotent
+from .middleware import sql_stats
+from .mixins import CreatorScopedMixin, EagerLoadingMixin, ValuesListMixin
+from .models import ORDER_TRANSITIONS, Order, Product, ProductReview, ProductCollection
+from .pagination import ProductPagination, CreatedAtPagination
+from .search import suggest_products
 from .serializers import OrderSerializer, ProductSerializer, ProductReviewSerializer, ProductCollectionSerializer
+from .serializers import OrderBulkTransitionSerializer, OrderTransitionSerializer
+from .serializers import SalesReportQuerySerializer, SalesReportRowSerializer
 from .permissions import CreatorOrAdminPermission, CreatorOrAdminPermission, OrderUpdatePermission, OrderCreatePermission
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(CachedResponseMixin, ValuesListMixin, EagerLoadingMixin, ModelViewSet):
     """ViewSet для товара."""
     queryset = Product.objects.all()
+    cache_models = (Product,)
     serializer_class = ProductSerializer
+    pagination_class = ProductPagination
+    values_list = True
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductFilter
+    suggest_min_length = 2
+    suggest_max_limit = 50
+
+    @action(detail=False)
+    @cache_response
+    def suggest(self, request):
+        """Подсказки для строки поиска: id и названия товаров по префиксу."""
+        prefix = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), self.suggest_max_limit)
+        except ValueError:
+            limit = 10
+        if len(prefix) < self.suggest_min_length or limit < 1:
+            return Response([])
+
+        return Response(list(suggest_products(self.get_queryset(), prefix, limit)))
 
     def get_permissions(self):
         permissions = [AllowAny]
@@ -24,27 +61,82 @@ class ProductViewSet(ModelViewSet):
         return [p() for p in permissions]
 
 
-class OrderViewSet(ModelViewSet):
+class OrderViewSet(CreatorScopedMixin, EagerLoadingMixin, ModelViewSet):
     """ViewSet для заказа."""
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
+    pagination_class = CreatedAtPagination
+    select_related_fields = ('creator',)
+    prefetch_related_fields = ('positions',)
+    # CreatorOrAdminPermission сравнивает creator_id с пользователем
+    permission_fields = ('creator',)
     filter_backends = [DjangoFilterBackend]
     filterset_class = OrderFilter
 
-    def list(self, request):
-        if not request.user.is_staff:
-            queryset = Order.objects.filter(creator=request.user)
-        else:
-            queryset = Order.objects.all()
-
-        serializer = OrderSerializer(queryset, many=True)
-        return Response(serializer.data)
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @action(detail=False, methods=['post'])
+    @idempotent
+    def batch(self, request):
+        """Создание нескольких заказов одним запросом."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def transition(self, request, pk=None):
+        """Переход заказа в следующий статус: NEW -> IN_PROGRESS -> DONE."""
+        serializer = OrderTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        status = serializer.validated_data['status']
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise NotFound()
+
+        with transaction.atomic():
+            updated, orders = Order.objects.filter(pk=pk).transition(status)
+            if updated:
+                record_transition(orders, ORDER_TRANSITIONS[status], status)
+                return Response({'id': pk, 'status': status})
+
+        current = Order.objects.filter(pk=pk).values_list('status', flat=True).first()
+        if current is None:
+            raise NotFound()
+        return Response({'detail': f'Нельзя перевести заказ из статуса {current} в {status}', 'status': current},
+                        status=HTTP_409_CONFLICT)
+
+    @action(detail=False, methods=['post'], url_path='transition')
+    def bulk_transition(self, request):
+        """Переход пачки заказов в следующий статус одним UPDATE; заказы в другом статусе пропускаются."""
+        serializer = OrderBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        status = serializer.validated_data['status']
+        ids = set(serializer.validated_data['ids'])
+
+        with transaction.atomic():
+            updated, orders = Order.objects.filter(pk__in=ids).transition(status)
+            if updated:
+                record_transition(orders, ORDER_TRANSITIONS[status], status)
+        return Response({'status': status, 'updated': updated, 'skipped': len(ids) - updated})
+
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Потоковая выгрузка заказов с учётом параметров OrderFilter."""
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = ('id', 'creator', 'status', 'total', 'created_at', 'updated_at', 'positions')
+        return export_response(request, order_rows(queryset), columns, 'orders')
 
     def get_permissions(self):
         permissions = [IsAuthenticated]
+        if self.action in ["export", "transition", "bulk_transition"]:
+            permissions += [IsAdminUser]
         if self.action in ["list", "retrieve", ]:
             permissions += [CreatorOrAdminPermission]
-        if self.action in ["create", ]:
+        if self.action in ["create", "batch"]:
             permissions += [OrderCreatePermission]
         if self.action in ["update", "partial_update", 'destroy']:
             permissions += [CreatorOrAdminPermission, OrderUpdatePermission]
@@ -52,15 +144,28 @@ class OrderViewSet(ModelViewSet):
         return [p() for p in permissions]
 
 
-class ProductReviewViewSet(ModelViewSet):
+class ProductReviewViewSet(ValuesListMixin, CreatorScopedMixin, EagerLoadingMixin, ModelViewSet):
     """ViewSet для отзыва."""
     queryset = ProductReview.objects.all()
     serializer_class = ProductReviewSerializer
+    pagination_class = CreatedAtPagination
+    select_related_fields = ('creator',)
+    scoped_actions = ('update', 'partial_update', 'destroy')
+    values_list = True
     filter_backends = [DjangoFilterBackend]
     filterset_class = ProductReviewFilter
 
+    @action(detail=False, renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Потоковая выгрузка отзывов с учётом параметров ProductReviewFilter."""
+        queryset = self.filter_queryset(self.get_queryset())
+        columns = ('id', 'creator', 'product_id', 'stars', 'text', 'created_at')
+        return export_response(request, review_rows(queryset), columns, 'reviews')
+
     def get_permissions(self):
         permissions = [AllowAny]
+        if self.action in ["export", ]:
+            permissions += [IsAdminUser]
         if self.action in ["create", ]:
             permissions += [IsAuthenticated]
         if self.action in ["update", "partial_update", 'destroy']:
@@ -69,10 +174,15 @@ class ProductReviewViewSet(ModelViewSet):
         return [p() for p in permissions]
 
 
-class ProductCollectionViewSet(ModelViewSet):
+class ProductCollectionViewSet(CachedResponseMixin, EagerLoadingMixin, ModelViewSet):
     """ViewSet для подборки."""
     queryset = ProductCollection.objects.all()
+    cache_models = (ProductCollection, Product)
     serializer_class = ProductCollectionSerializer
+    pagination_class = CreatedAtPagination
+    prefetch_related_fields = (
+        Prefetch('collection_items', queryset=Product.objects.only('id')),
+    )
 
     def get_permissions(self):
         permissions = [AllowAny]
@@ -80,3 +190,30 @@ class ProductCollectionViewSet(ModelViewSet):
             permissions += [IsAdminUser]
 
         return [p() for p in permissions]
+
+
+class MetricsViewSet(ViewSet):
+    """Счётчики кэшей, SQL, реплик и пулов соединений текущего процесса для администратора."""
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        return Response({
+            'token_auth_cache': token_cache.stats(),
+            'sql_instrumentation': sql_stats.stats(),
+            'replicas': replica_pool.stats(),
+            'db_pools': pool_stats(),
+        })
+
+
+class SalesAnalyticsViewSet(ViewSet):
+    """Выручка, заказы и проданные единицы из сводок продаж для администратора."""
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        params = SalesReportQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        report = sales_report(**params.validated_data)
+        return Response({
+            section: SalesReportRowSerializer(rows, many=True).data
+            for section, rows in report.items()
+        })
@@ -0,0 +1,196 @@
+import io
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, \
+    HTTP_403_FORBIDDEN
+
+from api import analytics
+from api.models import DailyProductSales, DailySales, Order, Position
+
+
+def _summary():
+    days = {(r.date, r.status): (r.orders, r.units, r.revenue) for r in DailySales.objects.exclude(orders=0)}
+    products = {(r.date, r.product_id_id): (r.units, r.revenue) for r in DailyProductSales.objects.exclude(units=0)}
+    return days, products
+
+
+@pytest.fixture(params=[True, False], ids=['upsert', 'bulk'])
+def upsert(request, monkeypatch):
+    """Сводки пишутся через INSERT ... ON CONFLICT или через bulk_update и bulk_create."""
+    if not request.param:
+        monkeypatch.setattr(analytics, '_supports_upsert', lambda connection: False)
+    return request.param
+
+
+@pytest.mark.django_db
+def test_sales_summary_maintained_incrementally(api_client, product_factory, user_factory, upsert):
+    """Тест: сводки продаж после создания, изменения и удаления заказов совпадают с полным пересчётом"""
+    p1, p2, p3 = product_factory(_quantity=3)
+    u = user_factory(_quantity=1)[0]
+    admin = user_factory(is_staff=True)
+    api_client.force_authenticate(user=u)
+
+    resp = api_client.post(reverse("orders-list"), {"positions": [
+        {"product_id": p1.id, "amount": 2}, {"product_id": p2.id, "amount": 1},
+    ]}, format='json')
+    assert resp.status_code == HTTP_201_CREATED
+    order_id = resp.json()['id']
+    resp = api_client.post(reverse("orders-batch"), [
+        {"positions": [{"product_id": p2.id, "amount": 3}]},
+        {"positions": [{"product_id": p3.id, "amount": 1}]},
+    ], format='json')
+    assert resp.status_code == HTTP_201_CREATED
+    deleted_id = resp.json()[1]['id']
+
+    resp = api_client.patch(reverse("orders-detail", args=[order_id]), {"positions": [
+        {"product_id": p1.id, "amount": 1}, {"product_id": p3.id, "amount": 4},
+    ]}, format='json')
+    assert resp.status_code == HTTP_200_OK
+    assert api_client.delete(reverse("orders-detail", args=[deleted_id])).status_code == HTTP_204_NO_CONTENT
+    api_client.force_authenticate(user=admin)
+    resp = api_client.patch(reverse("orders-detail", args=[order_id]), {"status": "IN_PROGRESS"}, format='json')
+    assert resp.status_code == HTTP_200_OK
+
+    incremental = _summary()
+    days, products = incremental
+    assert sorted(status for _, status in days) == ["IN_PROGRESS", "NEW"]
+    assert sum(units for _, units, _ in days.values()) == 8
+    assert sum(revenue for _, _, revenue in days.values()) == p1.price + p2.price * 3 + p3.price * 4
+
+    call_command('rebuild_sales_summary')
+    assert _summary() == incremental
+
+
+@pytest.mark.django_db
+def test_sales_summary_queries_independent_of_products(api_client, product_factory, user_factory, upsert):
+    """Тест: число запросов к сводкам при создании заказов не зависит от числа товаров"""
+    api_client.force_authenticate(user=user_factory())
+
+    def summary_queries(products):
+        orders = [{"positions": [{"product_id": p.id, "amount": 1}]} for p in products]
+        with CaptureQueriesContext(connection) as ctx:
+            assert api_client.post(reverse("orders-batch"), orders, format='json').status_code == HTTP_201_CREATED
+        return [q['sql'] for q in ctx.captured_queries if 'api_daily' in q['sql']]
+
+    sold = product_factory(_quantity=2)
+    summary_queries(sold)
+    # строки проданных товаров обновляются, новых — создаются
+    few = summary_queries(sold + product_factory(_quantity=2))
+    many = summary_queries(sold + product_factory(_quantity=20))
+    assert len(few) == len(many) == (2 if upsert else 5)
+    assert DailyProductSales.objects.count() == 24
+    assert {r.units for r in DailyProductSales.objects.filter(product_id__in=sold)} == {3}
+
+
+@pytest.mark.django_db
+def test_sales_analytics_endpoint(api_client, product_factory, user_factory):
+    """Тест отчёта о продажах: только для администратора, разрезы по дням, статусам и товарам"""
+    p = product_factory(price=Decimal('10.50'))
+    u = user_factory()
+    api_client.force_authenticate(user=u)
+    api_client.post(reverse("orders-batch"), [
+        {"positions": [{"product_id": p.id, "amount": 2}]},
+        {"positions": [{"product_id": p.id, "amount": 1}]},
+    ], format='json')
+    url = reverse("sales_analytics-list")
+
+    assert api_client.get(url).status_code == HTTP_403_FORBIDDEN
+
+    api_client.force_authenticate(user=user_factory(is_staff=True))
+    resp = api_client.get(url)
+    assert resp.status_code == HTTP_200_OK
+    report = resp.json()
+    assert [(r['orders'], r['units'], r['revenue']) for r in report['by_day']] == [(2, 3, '31.50')]
+    assert [(r['status'], r['orders']) for r in report['by_status']] == [('NEW', 2)]
+    assert [(r['product_id'], r['name'], r['units'], r['revenue']) for r in report['by_product']] == \
+        [(p.id, p.name, 3, '31.50')]
+
+    day = report['by_day'][0]['date']
+    assert api_client.get(url, {"date_to": "2000-01-01"}).json()['by_day'] == []
+    assert api_client.get(url, {"date_from": day, "date_to": day}).json()['by_day'] == report['by_day']
+    assert api_client.get(url, {"date_from": day, "date_to": "2000-01-01"}).status_code == HTTP_400_BAD_REQUEST
+
+
+def _create_order(api_client, positions):
+    resp = api_client.post(reverse("orders-list"), {"positions": [
+        {"product_id": p.id, "amount": amount} for p, amount in positions
+    ]}, format='json')
+    assert resp.status_code == HTTP_201_CREATED
+    return resp.json()['id']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sales_summary_rebuilt_after_admin_edit(client, api_client, product_factory, user_factory):
+    """Тест: правка позиций заказа в админке пересчитывает сводки после коммита"""
+    p = product_factory(price=Decimal('10.00'))
+    u = user_factory()
+    api_client.force_authenticate(user=u)
+    order = Order.objects.get(id=_create_order(api_client, [(p, 2)]))
+    position = order.positions.get()
+    client.force_login(user_factory(is_staff=True, is_superuser=True))
+
+    resp = client.post(reverse('admin:api_order_change', args=[order.id]), {
+        'creator': u.id, 'status': 'NEW', 'total': '50.00',
+        'positions-TOTAL_FORMS': 1, 'positions-INITIAL_FORMS': 1,
+        'positions-MIN_NUM_FORMS': 0, 'positions-MAX_NUM_FORMS': 1000,
+        'positions-0-id': position.id, 'positions-0-order_id': order.id,
+        'positions-0-product_id': p.id, 'positions-0-amount': 5, 'positions-0-unit_price': '10.00',
+    })
+    assert resp.status_code == 302
+
+    days, products = _summary()
+    assert [(units, revenue) for _, units, revenue in days.values()] == [(5, Decimal('50.00'))]
+    assert [units for units, _ in products.values()] == [5]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sales_summary_rebuilt_after_product_delete(api_client, product_factory, user_factory):
+    """Тест: удаление товара вместе с его позициями не оставляет их вклад в сводках"""
+    p1, p2 = product_factory(_quantity=2)
+    api_client.force_authenticate(user=user_factory())
+    _create_order(api_client, [(p1, 1), (p2, 3)])
+    _create_order(api_client, [(p1, 2)])
+
+    p1.delete()
+
+    rebuilt = _summary()
+    days, products = rebuilt
+    assert sum(units for _, units, _ in days.values()) == 3
+    assert [product for _, product in products] == [p2.id]
+    call_command('rebuild_sales_summary')
+    assert _summary() == rebuilt
+
+
+@pytest.mark.django_db
+def test_sales_summary_rebuilt_by_recalculate_order_totals(api_client, product_factory, user_factory):
+    """Тест: recalculate_order_totals обновляет выручку в сводках вместе с суммами заказов"""
+    p = product_factory(price=Decimal('10.00'))
+    api_client.force_authenticate(user=user_factory())
+    order_id = _create_order(api_client, [(p, 3)])
+    Position.objects.filter(order_id=order_id).update(unit_price=Decimal('7.00'))
+
+    call_command('recalculate_order_totals', stdout=io.StringIO())
+
+    days, _ = _summary()
+    assert [revenue for _, _, revenue in days.values()] == [Decimal('21.00')]
+
+
+@pytest.mark.django_db
+def test_sales_summary_not_tracked_for_queryset_update(api_client, product_factory, user_factory):
+    """Тест: QuerySet.update() в обход моделей сводки не видят, их исправляет rebuild_sales_summary"""
+    p = product_factory()
+    api_client.force_authenticate(user=user_factory())
+    order_id = _create_order(api_client, [(p, 1)])
+
+    Order.objects.filter(id=order_id).update(status='DONE')
+
+    days, _ = _summary()
+    assert [status for _, status in days] == ['NEW']
+    call_command('rebuild_sales_summary')
+    days, _ = _summary()
+    assert [status for _, status in days] == ['DONE']
@@ -7,7 +7,8 @@ from django.urls import reverse
 from rest_framework.status import HTTP_200_OK, \
     HTTP_201_CREATED, \
     HTTP_204_NO_CONTENT, \
-    HTTP_403_FORBIDDEN
+    HTTP_403_FORBIDDEN, \
+    HTTP_404_NOT_FOUND
 
 
 # ------------- Product tests ------------------
@@ -47,7 +48,7 @@ def test_product_list(api_client, product_factory):
     resp = api_client.get(url)
 
     assert resp.status_code == HTTP_200_OK
-    resp_json = resp.json()
+    resp_json = resp.json()['results']
     assert len(resp_json) == q
     assert {p.id for p in products} == {p.get('id') for p in resp_json}
     assert {p.name for p in products} == {p.get('name') for p in resp_json}
@@ -126,7 +127,7 @@ def test_product_delete(api_client, product_factory, user_factory, is_staff, exp
 @pytest.mark.parametrize(["is_staff", "exp_status"],
                          (
                                  (True, HTTP_200_OK),
-                                 (False, HTTP_403_FORBIDDEN)
+                                 (False, HTTP_404_NOT_FOUND)
                          )
                          )
 @pytest.mark.django_db
@@ -170,14 +171,14 @@ def test_orders_list(api_client, order_factory, user_factory):
     resp = api_client.get(url)
 
     assert resp.status_code == HTTP_200_OK
-    resp_json = resp.json()
+    resp_json = resp.json()['results']
     assert len(resp_json) == q
 
 
 @pytest.mark.parametrize(["is_staff", "exp_status"],
                          (
                                  (True, HTTP_200_OK),
-                                 (False, HTTP_403_FORBIDDEN)
+                                 (False, HTTP_404_NOT_FOUND)
                          )
                          )
 @pytest.mark.django_db
@@ -208,7 +209,7 @@ def test_orders_retrieve(api_client, order_factory, user_factory, is_staff, exp_
 @pytest.mark.parametrize(["is_staff", "exp_status"],
                          (
                                  (True, HTTP_200_OK),
-                                 (False, HTTP_403_FORBIDDEN)
+                                 (False, HTTP_404_NOT_FOUND)
                          )
                          )
 @pytest.mark.django_db
@@ -221,19 +222,19 @@ def test_orders_patch(api_client, order_factory, user_factory, is_staff, exp_sta
     u = user_factory(_quantity=1)[0]
     u.is_staff = is_staff
     api_client.force_authenticate(user=u)
-    resp = api_client.patch(url, {"status": "DONE"})
+    resp = api_client.patch(url, {"status": "IN_PROGRESS"})
 
     assert resp.status_code == exp_status
     if is_staff:
         resp_json = resp.json()
         assert o.id == resp_json.get('id')
-        assert resp_json.get('status') == 'DONE'
+        assert resp_json.get('status') == 'IN_PROGRESS'
 
 
 @pytest.mark.parametrize(["is_staff", "exp_status"],
                          (
                                  (True, HTTP_204_NO_CONTENT),
-                                 (False, HTTP_403_FORBIDDEN)
+                                 (False, HTTP_404_NOT_FOUND)
                          )
                          )
 @pytest.mark.django_db
@@ -280,7 +281,7 @@ def test_review_list(api_client, review_factory, user_factory):
     resp = api_client.get(url)
 
     assert resp.status_code == HTTP_200_OK
-    resp_json = resp.json()
+    resp_json = resp.json()['results']
     assert len(resp_json) == q
 
 
@@ -306,7 +307,7 @@ def test_reviews_retrieve(api_client, review_factory):
 @pytest.mark.parametrize(["is_staff", "exp_status"],
                          (
                                  (True, HTTP_200_OK),
-                                 (False, HTTP_403_FORBIDDEN)
+                                 (False, HTTP_404_NOT_FOUND)
                          )
                          )
 @pytest.mark.django_db
@@ -332,7 +333,7 @@ def test_reviews_patch(api_client, review_factory, user_factory, is_staff, exp_s
 @pytest.mark.parametrize(["is_staff", "exp_status"],
                          (
                                  (True, HTTP_204_NO_CONTENT),
-                                 (False, HTTP_403_FORBIDDEN)
+                                 (False, HTTP_404_NOT_FOUND)
                          )
                          )
 @pytest.mark.django_db
@@ -388,7 +389,7 @@ def test_collection_list(api_client, collection_factory, user_factory):
     resp = api_client.get(url)
 
     assert resp.status_code == HTTP_200_OK
-    resp_json = resp.json()
+    resp_json = resp.json()['results']
     assert len(resp_json) == q
 
 
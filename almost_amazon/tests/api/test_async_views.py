@@ -0,0 +1,109 @@
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND, HTTP_405_METHOD_NOT_ALLOWED
+
+from .test_benchmarks import write_report
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_read_views_match_sync(api_client, product_factory, review_factory, collection_factory):
+    """Тест: async-представления возвращают то же, что и синхронные"""
+    products = product_factory(_quantity=3)
+    review_factory(_quantity=3)
+    collection_factory(collection_items=products)
+    client = AsyncClient()
+
+    for name, args in (("products-list", []), ("products-detail", [products[0].id]),
+                       ("product_reviews-list", []), ("product_collections-list", [])):
+        sync_resp = api_client.get(reverse(name, args=args))
+        async_resp = async_to_sync(client.get)(reverse(f"async_{name}", args=args))
+        assert async_resp.status_code == sync_resp.status_code == HTTP_200_OK
+        assert async_resp.json() == sync_resp.json()
+
+    resp = async_to_sync(client.get)(reverse("async_products-detail", args=[0]))
+    assert resp.status_code == HTTP_404_NOT_FOUND
+    resp = async_to_sync(client.post)(reverse("async_products-list"), {"name": "товар"})
+    assert resp.status_code == HTTP_405_METHOD_NOT_ALLOWED
+
+
+def _stats(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2),
+    }
+
+
+def _split(requests, concurrency):
+    """Запросы поровну на воркеры; воркеров не больше, чем запросов, чтобы ни один не остался без замеров."""
+    workers = max(min(concurrency, requests), 1)
+    return [requests // workers + (i < requests % workers) for i in range(workers)]
+
+
+def _run_wsgi(url, concurrency, requests):
+    """Синхронный путь: пул потоков, как у gunicorn с --threads."""
+    def worker(count):
+        client, latencies = Client(), []
+        for _ in range(count):
+            started = time.perf_counter()
+            assert client.get(url).status_code == HTTP_200_OK
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    started = time.perf_counter()
+    counts = _split(requests, concurrency)
+    with ThreadPoolExecutor(len(counts)) as pool:
+        latencies = [t for chunk in pool.map(worker, counts) for t in chunk]
+    return _stats(latencies, time.perf_counter() - started)
+
+
+def _run_asgi(url, concurrency, requests):
+    """Async-путь: одновременные запросы в одном цикле событий, как у воркера uvicorn."""
+    async def worker(count):
+        client, latencies = AsyncClient(), []
+        for _ in range(count):
+            started = time.perf_counter()
+            assert (await client.get(url)).status_code == HTTP_200_OK
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    async def main():
+        chunks = await asyncio.gather(*(worker(count) for count in _split(requests, concurrency)))
+        return [t for chunk in chunks for t in chunk]
+
+    started = time.perf_counter()
+    latencies = async_to_sync(main)()
+    return _stats(latencies, time.perf_counter() - started)
+
+
+def test_split_requests():
+    """Тест: запросы делятся на воркеры без остатка и без пустых воркеров"""
+    assert _split(10, 4) == [3, 3, 2, 2]
+    assert _split(5, 32) == [1] * 5
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_async_vs_sync(product_factory, review_factory, tmp_path):
+    """Сравнение rps и p99 синхронного и async-пути при одинаковой конкурентности"""
+    concurrency = int(os.environ.get('BENCH_CONCURRENCY', 32))
+    # не BENCH_REQUESTS: там число запросов на действие в test_benchmarks.py
+    requests = max(int(os.environ.get('BENCH_ASYNC_REQUESTS', 2000)), 1)
+    products = product_factory(_quantity=100, _bulk_create=True)
+    review_factory(_quantity=1000, product_id=products[0], _bulk_create=True)
+
+    results = {}
+    for name in ("product_reviews-list", "products-list"):
+        results[f'{name}-wsgi'] = _run_wsgi(reverse(name), concurrency, requests)
+        results[f'{name}-asgi'] = _run_asgi(reverse(f"async_{name}"), concurrency, requests)
+    write_report('async-vs-sync', {'meta': {'concurrency': concurrency, 'requests': requests},
+                                   'results': results}, tmp_path)
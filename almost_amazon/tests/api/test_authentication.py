@@ -0,0 +1,139 @@
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+
+from api import authentication
+from api.authentication import TokenCache, token_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture
+def token_client(api_client, user_factory):
+    u = user_factory(_quantity=1)[0]
+    token = Token.objects.create(user=u)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return api_client, u, token
+
+
+@pytest.mark.django_db
+def test_token_cached_after_first_request(token_client, django_assert_num_queries):
+    """Тест: повторный запрос с тем же токеном не обращается к БД за пользователем"""
+    api_client, u, token = token_client
+    url = reverse("orders-list")
+
+    assert api_client.get(url).status_code == HTTP_200_OK
+    with django_assert_num_queries(1):  # только выборка заказов
+        assert api_client.get(url).status_code == HTTP_200_OK
+
+    stats = token_cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_token_cache_invalidated(token_client):
+    """Тест: удаление токена и деактивация пользователя сбрасывают кэш"""
+    api_client, u, token = token_client
+    url = reverse("orders-list")
+    assert api_client.get(url).status_code == HTTP_200_OK
+
+    u.is_active = False
+    u.save()
+    assert api_client.get(url).status_code == HTTP_401_UNAUTHORIZED
+
+    u.is_active = True
+    u.save()
+    assert api_client.get(url).status_code == HTTP_200_OK
+
+    token.delete()
+    assert api_client.get(url).status_code == HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_token_cache_invalidated_after_commit(token_client):
+    """Тест: пользователь, закэшированный параллельным запросом до коммита, сбрасывается после коммита"""
+    api_client, u, token = token_client
+    url = reverse("orders-list")
+    assert api_client.get(url).status_code == HTTP_200_OK
+    stale = token_cache.get(token.key)
+
+    with transaction.atomic():
+        u.is_active = False
+        u.save()
+        # параллельный запрос ещё видит активного пользователя и кэширует его
+        token_cache.set(token.key, stale)
+
+    assert token_cache.get(token.key) is None
+    assert api_client.get(url).status_code == HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_token_revoked_in_other_workers(token_client, monkeypatch):
+    """Тест: с общим кэшем удаление токена и деактивация пользователя сразу действуют в других процессах"""
+    api_client, u, token = token_client
+    monkeypatch.setattr(authentication.token_cache, 'cache_alias', 'default')
+    # второй экземпляр с общим кэшем изображает другой процесс со своим LRU
+    other = TokenCache(cache_alias='default')
+    url = reverse("orders-list")
+    assert api_client.get(url).status_code == HTTP_200_OK
+    cached = token_cache.get(token.key)
+    other.set(token.key, cached)
+    assert other.get(token.key) == cached
+
+    u.is_active = False
+    u.save()
+    assert other.get(token.key) is None
+
+    u.is_active = True
+    u.save()
+    assert api_client.get(url).status_code == HTTP_200_OK
+    other.set(token.key, token_cache.get(token.key))
+    assert other.get(token.key) is not None
+
+    token.delete()
+    assert other.get(token.key) is None
+    assert other.stats()['hits'] == 2
+
+
+def test_token_cache_lru_and_ttl(monkeypatch):
+    """Тест вытеснения и истечения записей кэша"""
+    now = [100.0]
+    monkeypatch.setattr('api.authentication.time.monotonic', lambda: now[0])
+    cache = TokenCache(max_size=2, ttl=10)
+
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)  # вытесняет давно не использованный 'b'
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+
+    now[0] += 11
+    assert cache.get('a') is None
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.parametrize(["is_staff", "exp_status"],
+                         (
+                                 (True, HTTP_200_OK),
+                                 (False, HTTP_403_FORBIDDEN)
+                         )
+                         )
+@pytest.mark.django_db
+def test_metrics(api_client, user_factory, is_staff, exp_status):
+    """Тест счётчиков кэша для администратора"""
+    u = user_factory(_quantity=1)[0]
+    u.is_staff = is_staff
+    api_client.force_authenticate(user=u)
+    resp = api_client.get(reverse("metrics-list"))
+
+    assert resp.status_code == exp_status
+    if is_staff:
+        assert 'hits' in resp.json()['token_auth_cache']
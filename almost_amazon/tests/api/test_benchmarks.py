@@ -0,0 +1,307 @@
+"""Нагрузочный набор: задержки и число SQL-запросов для всех действий роутера.
+
+Запуск: pytest -m benchmark tests/api/test_benchmarks.py -s
+
+BENCH_SCALE     доля полного объёма FULL_VOLUME, по умолчанию 0.01
+BENCH_REQUESTS  запросов на действие, по умолчанию 30
+BENCH_REPORT    каталог для отчётов JSON всех бенчмарков, по умолчанию временный каталог теста
+BENCH_BASELINE  сохранённый отчёт router-actions.json, с которым сравнивается текущий
+BENCH_TOLERANCE допустимый рост p50 и p99, по умолчанию 0.25
+"""
+import io
+import json
+import math
+import os
+import time
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from almost_amazon.urls import router
+from api.models import Order, OrderStatusChoices, Product, ProductReview
+
+FULL_VOLUME = {'products': 100_000, 'reviews': 1_000_000, 'orders': 200_000}
+POSITIONS_PER_ORDER = 10
+CHUNK_SIZE = 10_000
+# задержка растёт в пределах погрешности таймера — не регрессия
+MIN_DELTA_MS = 2
+
+Case = namedtuple('Case', ['basename', 'action', 'method', 'request', 'repeat'])
+
+
+def _ids(queryset):
+    # SQLite в Django 3.1 не возвращает pk из bulk_create, поэтому pk читаются из БД
+    return list(queryset.order_by('id').values_list('id', flat=True))
+
+
+def _chunks(total):
+    for start in range(0, total, CHUNK_SIZE):
+        yield range(start, min(start + CHUNK_SIZE, total))
+
+
+def _price(i):
+    return Decimal(1 + i % 1000)
+
+
+def _seed(volume, product_factory, user_factory, review_factory, order_factory, position_factory):
+    """Заполняет БД пачками через фабрики conftest с _bulk_create."""
+    n_products, n_reviews, n_orders = volume['products'], volume['reviews'], volume['orders']
+    for chunk in _chunks(n_products):
+        product_factory(_quantity=len(chunk), _bulk_create=True, description='',
+                        name=iter(f'Товар {i}' for i in chunk), price=iter(_price(i) for i in chunk))
+    products = [Product(pk=pk) for pk in _ids(Product.objects.all())]
+
+    # у пользователя не больше одного отзыва на товар
+    n_users = max(math.ceil(n_reviews / n_products), 10)
+    user_factory(_quantity=n_users, _bulk_create=True, username=iter(f'bench{i}' for i in range(n_users)))
+    users = [User(pk=pk) for pk in _ids(User.objects.filter(username__startswith='bench'))]
+
+    for chunk in _chunks(n_reviews):
+        review_factory(_quantity=len(chunk), _bulk_create=True, text='',
+                       creator=iter(users[k // n_products] for k in chunk),
+                       product_id=iter(products[k % n_products] for k in chunk),
+                       stars=iter(k % 6 for k in chunk))
+
+    statuses = list(OrderStatusChoices.values)
+    for chunk in _chunks(n_orders):
+        order_factory(_quantity=len(chunk), _bulk_create=True, total=0,
+                      creator=iter(users[j % n_users] for j in chunk),
+                      status=iter(statuses[j % len(statuses)] for j in chunk))
+    orders = [Order(pk=pk) for pk in _ids(Order.objects.all())]
+
+    for chunk in _chunks(n_orders * POSITIONS_PER_ORDER):
+        position_factory(_quantity=len(chunk), _bulk_create=True, amount=1,
+                         order_id=iter(orders[k // POSITIONS_PER_ORDER] for k in chunk),
+                         product_id=iter(products[k % n_products] for k in chunk),
+                         unit_price=iter(_price(k % n_products) for k in chunk))
+
+    # bulk_create не вызывает сигналы, агрегаты и сводки пересчитываются целиком
+    call_command('recalculate_order_totals', stdout=io.StringIO())
+    call_command('rebuild_product_ratings', stdout=io.StringIO())
+    call_command('rebuild_sales_summary', stdout=io.StringIO())
+
+
+def _cases(ids, requests):
+    """По запросу на каждое действие роутера; request(i) возвращает (url, тело)."""
+    products, orders, reviews, collections, spare = (
+        ids['products'], ids['orders'], ids['reviews'], ids['collections'], ids['spare_products'])
+
+    def at(values, i):
+        return values[i % len(values)]
+
+    def url(name, *args, **params):
+        return reverse(name, args=args) + ('?' + urlencode(params) if params else '')
+
+    def positions(i):
+        return [{"product_id": at(products, i * 3 + t), "amount": 1 + t} for t in range(3)]
+
+    def review_product(i):
+        # отзыв с индексом k при заполнении написан на товар k % n_products
+        return at(products, i % len(reviews) % len(products))
+
+    return [
+        Case('products', 'list', 'get', lambda i: (url('products-list', price_from=i % 1000), None), 1),
+        Case('products', 'retrieve', 'get', lambda i: (url('products-detail', at(products, i)), None), 1),
+        Case('products', 'suggest', 'get', lambda i: (url('products-suggest', q=f'Товар {i}'), None), 1),
+        Case('products', 'create', 'post', lambda i: (
+            url('products-list'), {"name": f"Новый товар {i}", "description": "описание", "price": "10.00"}), 1),
+        Case('products', 'update', 'put', lambda i: (
+            url('products-detail', at(products, i)), {"name": f"Товар {i}", "description": "описание", "price": "11.00"}), 1),
+        Case('products', 'partial_update', 'patch', lambda i: (
+            url('products-detail', at(products, i)), {"price": "12.00"}), 1),
+        Case('products', 'destroy', 'delete', lambda i: (url('products-detail', spare[-(i + 1)]), None), 1),
+
+        Case('orders', 'list', 'get', lambda i: (url('orders-list', status='NEW'), None), 1),
+        Case('orders', 'retrieve', 'get', lambda i: (url('orders-detail', at(orders, i)), None), 1),
+        Case('orders', 'create', 'post', lambda i: (url('orders-list'), {"positions": positions(i)}), 1),
+        Case('orders', 'batch', 'post', lambda i: (
+            url('orders-batch'), [{"positions": positions(i * 10 + k)} for k in range(10)]), 1),
+        Case('orders', 'update', 'put', lambda i: (
+            url('orders-detail', at(orders, i)), {"positions": positions(i)}), 1),
+        Case('orders', 'partial_update', 'patch', lambda i: (
+            url('orders-detail', at(orders, i)), {"positions": positions(i + 1)}), 1),
+        Case('orders', 'export', 'get', lambda i: (
+            url('orders-export', format='ndjson', total_min=i * 10, total_max=i * 10 + 10), None), 0.2),
+        Case('orders', 'destroy', 'delete', lambda i: (url('orders-detail', orders[-(i + 1)]), None), 1),
+        # заказ с индексом j при заполнении получил статус statuses[j % 3], с середины списка идут NEW
+        Case('orders', 'transition', 'post', lambda i: (
+            url('orders-transition', at(orders, len(orders) // 6 * 3 + i * 3)), {"status": "IN_PROGRESS"}), 1),
+        Case('orders', 'bulk_transition', 'post', lambda i: (
+            url('orders-bulk-transition'), {"ids": [at(orders, (i * 1000 + k) * 3 + 1) for k in range(1000)],
+                                            "status": "DONE"}), 0.2),
+
+        Case('product_reviews', 'list', 'get', lambda i: (url('product_reviews-list', stars_from=i % 6), None), 1),
+        Case('product_reviews', 'retrieve', 'get', lambda i: (
+            url('product_reviews-detail', at(reviews, i)), None), 1),
+        Case('product_reviews', 'create', 'post', lambda i: (
+            url('product_reviews-list'), {"product_id": spare[i], "text": "отзыв", "stars": 5}), 1),
+        Case('product_reviews', 'update', 'put', lambda i: (
+            url('product_reviews-detail', at(reviews, i)),
+            {"product_id": review_product(i), "text": "новый текст", "stars": 4}), 1),
+        Case('product_reviews', 'partial_update', 'patch', lambda i: (
+            url('product_reviews-detail', at(reviews, i)), {"stars": 3}), 1),
+        Case('product_reviews', 'export', 'get', lambda i: (
+            url('product_reviews-export', format='ndjson', product_id=at(products, i)), None), 1),
+        Case('product_reviews', 'destroy', 'delete', lambda i: (
+            url('product_reviews-detail', reviews[-(i + 1)]), None), 1),
+
+        Case('product_collections', 'list', 'get', lambda i: (url('product_collections-list'), None), 1),
+        Case('product_collections', 'retrieve', 'get', lambda i: (
+            url('product_collections-detail', at(collections, i)), None), 1),
+        Case('product_collections', 'create', 'post', lambda i: (
+            url('product_collections-list'),
+            {"title": f"Подборка {i}", "text": "текст", "collection_items": products[i:i + 20]}), 1),
+        Case('product_collections', 'update', 'put', lambda i: (
+            url('product_collections-detail', at(collections, i)),
+            {"title": f"Подборка {i}", "text": "текст", "collection_items": products[i + 1:i + 21]}), 1),
+        Case('product_collections', 'partial_update', 'patch', lambda i: (
+            url('product_collections-detail', at(collections, i)), {"title": f"Подборка {i}"}), 1),
+        Case('product_collections', 'destroy', 'delete', lambda i: (
+            url('product_collections-detail', collections[-(i + 1)]), None), 1),
+
+        Case('metrics', 'list', 'get', lambda i: (url('metrics-list'), None), 1),
+        Case('sales_analytics', 'list', 'get', lambda i: (
+            url('sales_analytics-list', date_from=date.today().isoformat()), None), 1),
+    ]
+
+
+def _router_actions():
+    actions = set()
+    for prefix, viewset, basename in router.registry:
+        for route in router.get_routes(viewset):
+            actions.update((basename, action) for action in router.get_method_map(viewset, route.mapping).values())
+    return actions
+
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, max(math.ceil(q * len(values)) - 1, 0))]
+
+
+def _measure(client, case, requests):
+    latencies, queries = [], []
+    for i in range(max(int(requests * case.repeat), 3)):
+        path, data = case.request(i)
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            resp = getattr(client, case.method)(path, data, format='json')
+            if resp.streaming:
+                b''.join(resp.streaming_content)
+            latencies.append((time.perf_counter() - started) * 1000)
+        assert resp.status_code < 300, (case.basename, case.action, resp.status_code, resp.content[:300])
+        queries.append(len(ctx.captured_queries))
+
+    latencies.sort()
+    return {
+        'method': case.method.upper(),
+        'requests': len(latencies),
+        'p50_ms': round(_percentile(latencies, 0.5), 3),
+        'p90_ms': round(_percentile(latencies, 0.9), 3),
+        'p99_ms': round(_percentile(latencies, 0.99), 3),
+        'max_ms': round(latencies[-1], 3),
+        'queries_avg': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def write_report(name, report, tmp_path):
+    """Пишет отчёт бенчмарка в <BENCH_REPORT>/<name>.json и печатает строки results."""
+    directory = os.environ.get('BENCH_REPORT') or str(tmp_path)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{name}.json')
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, ensure_ascii=False, indent=2)
+
+    print()
+    print(f'отчёт: {path}')
+    for row, result in report['results'].items():
+        print(f'{row:40} ' + ' '.join(f'{metric}={value}' for metric, value in result.items()))
+    return path
+
+
+def compare_reports(report, baseline, tolerance):
+    """Регрессии текущего отчёта относительно сохранённого."""
+    regressions = []
+    for name, current in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if current[metric] > base[metric] * (1 + tolerance) and current[metric] - base[metric] > MIN_DELTA_MS:
+                regressions.append(f"{name} {metric}: {base[metric]} -> {current[metric]}")
+        if current['queries_max'] > base['queries_max']:
+            regressions.append(f"{name} queries_max: {base['queries_max']} -> {current['queries_max']}")
+    return regressions
+
+
+def test_compare_reports():
+    """Тест сравнения отчёта с сохранённым"""
+    baseline = {'results': {'products-list': {'p50_ms': 10, 'p99_ms': 20, 'queries_max': 2}}}
+    same = {'results': {'products-list': {'p50_ms': 11, 'p99_ms': 21, 'queries_max': 2}, 'new-action': {}}}
+    slower = {'results': {'products-list': {'p50_ms': 20, 'p99_ms': 21, 'queries_max': 3}}}
+
+    assert compare_reports(same, baseline, 0.25) == []
+    assert compare_reports(slower, baseline, 0.25) == [
+        'products-list p50_ms: 10 -> 20', 'products-list queries_max: 2 -> 3',
+    ]
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_benchmark_router_actions(product_factory, user_factory, review_factory, order_factory,
+                                  position_factory, collection_factory, tmp_path):
+    """Задержки и число запросов для каждого действия роутера на заполненной БД"""
+    scale = float(os.environ.get('BENCH_SCALE', 0.01))
+    requests = int(os.environ.get('BENCH_REQUESTS', 30))
+    volume = {name: max(int(count * scale), 100) for name, count in FULL_VOLUME.items()}
+
+    started = time.perf_counter()
+    _seed(volume, product_factory, user_factory, review_factory, order_factory, position_factory)
+    ids = {
+        'products': _ids(Product.objects.all()),
+        'orders': _ids(Order.objects.all()),
+        'reviews': _ids(ProductReview.objects.all()),
+    }
+    ids['spare_products'] = [p.pk for p in product_factory(_quantity=requests * 2, price=Decimal('1.00'))]
+    items = list(Product.objects.filter(pk__in=ids['products'][:20]))
+    ids['collections'] = [collection_factory(collection_items=items).pk for _ in range(requests * 2)]
+    seed_seconds = time.perf_counter() - started
+
+    cases = _cases(ids, requests)
+    assert {(case.basename, case.action) for case in cases} == _router_actions(), \
+        'у каждого действия роутера должен быть сценарий нагрузки'
+
+    admin = user_factory(is_staff=True)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=admin).key)
+    report = {
+        'meta': {
+            'vendor': connection.vendor,
+            'scale': scale,
+            'volume': volume,
+            'requests': requests,
+            'seed_seconds': round(seed_seconds, 1),
+        },
+        'results': {f'{case.basename}-{case.action}': _measure(client, case, requests) for case in cases},
+    }
+
+    write_report('router-actions', report, tmp_path)
+
+    baseline_path = os.environ.get('BENCH_BASELINE')
+    if baseline_path:
+        with open(baseline_path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        for key in ('vendor', 'volume'):
+            assert baseline['meta'][key] == report['meta'][key], f'отчёты с разными {key} сравнивать нельзя'
+        tolerance = float(os.environ.get('BENCH_TOLERANCE', 0.25))
+        regressions = compare_reports(report, baseline, tolerance)
+        assert not regressions, 'регрессии относительно ' + baseline_path + ':\n' + '\n'.join(regressions)
@@ -0,0 +1,79 @@
+import pytest
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_product_list_etag(api_client, product_factory, django_assert_num_queries):
+    """Тест: повторный запрос с If-None-Match получает 304 без запросов к БД"""
+    product_factory(_quantity=3)
+    url = reverse("products-list")
+    resp = api_client.get(url)
+    etag = resp['ETag']
+
+    assert resp.status_code == HTTP_200_OK
+    with django_assert_num_queries(0):
+        resp = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == HTTP_304_NOT_MODIFIED
+
+    with django_assert_num_queries(0):
+        resp = api_client.get(url)
+    assert resp.status_code == HTTP_200_OK
+    assert resp['ETag'] == etag
+    assert len(resp.json()['results']) == 3
+
+
+@pytest.mark.django_db
+def test_product_cache_invalidated_on_write(api_client, product_factory, review_factory):
+    """Тест: изменение товара и новый отзыв меняют ETag"""
+    p = product_factory(_quantity=1)[0]
+    url = reverse("products-detail", args=[p.id])
+    etag = api_client.get(url)['ETag']
+
+    p.name = "новое имя"
+    p.save()
+    resp = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == HTTP_200_OK
+    assert resp.json()['name'] == "новое имя"
+
+    etag = resp['ETag']
+    review_factory(product_id=p, stars=4)
+    resp = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert resp.status_code == HTTP_200_OK
+    assert resp.json()['review_count'] == 1
+
+
+@pytest.mark.django_db
+def test_collection_cache_invalidated_on_items_change(api_client, collection_factory, product_factory):
+    """Тест: изменение состава подборки меняет ответ"""
+    c = collection_factory(_quantity=1)[0]
+    p = product_factory(_quantity=1)[0]
+    url = reverse("product_collections-detail", args=[c.id])
+    assert api_client.get(url).json()['collection_items'] == []
+
+    c.collection_items.add(p)
+    assert api_client.get(url).json()['collection_items'] == [p.id]
+
+
+@pytest.mark.django_db
+def test_cache_keyed_by_query_params(api_client, product_factory):
+    """Тест: разные параметры запроса кэшируются отдельно"""
+    product_factory(_quantity=1, price=10)
+    product_factory(_quantity=1, price=100)
+    url = reverse("products-list")
+
+    assert len(api_client.get(url).json()['results']) == 2
+    assert len(api_client.get(url, {"price_from": 50}).json()['results']) == 1
+
+
+@pytest.mark.django_db
+def test_cache_keyed_by_host_and_scheme(api_client, product_factory, settings):
+    """Тест: абсолютные ссылки пагинации в кэше не попадают клиенту с другим хостом или схемой"""
+    settings.ALLOWED_HOSTS = ['a.example', 'b.example']
+    product_factory(_quantity=2)
+    url = reverse("products-list")
+
+    assert api_client.get(url, {"page_size": 1}, HTTP_HOST='a.example').json()['next'].startswith('http://a.example/')
+    assert api_client.get(url, {"page_size": 1}, HTTP_HOST='b.example').json()['next'].startswith('http://b.example/')
+    resp = api_client.get(url, {"page_size": 1}, HTTP_HOST='a.example', secure=True)
+    assert resp.json()['next'].startswith('https://a.example/')
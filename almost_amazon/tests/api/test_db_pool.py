@@ -0,0 +1,207 @@
+import threading
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.db.backends.postgresql import creation
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from api.db_pool import base, pool as pool_module
+from api.db_pool.pool import ConnectionPool, PoolTimeout, close_pools, get_pool
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, sql):
+        pass
+
+
+class FakeConnection:
+    isolation_level = None
+
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.healthy = True
+        self.status = TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def cursor(self):
+        if not self.healthy:
+            raise ConnectionError('соединение разорвано')
+        return FakeCursor()
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = TRANSACTION_STATUS_IDLE
+
+
+class FakeConnect:
+    """Фабрика соединений для пула без PostgreSQL."""
+
+    def __init__(self):
+        self.connections = []
+
+    def __call__(self):
+        self.connections.append(FakeConnection(len(self.connections)))
+        return self.connections[-1]
+
+
+def _check(connection):
+    if not connection.healthy:
+        raise ConnectionError('соединение разорвано')
+
+
+def test_pool_reuses_connections():
+    """Тест: возвращённое соединение выдаётся снова, min_size соединений создаются заранее"""
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, min_size=2, max_size=4, check=_check)
+
+    first = pool.acquire()
+    assert len(connect.connections) == 2
+    pool.release(first)
+    assert pool.acquire() is first
+
+    stats = pool.stats()
+    assert (stats['size'], stats['idle'], stats['in_use'], stats['checkouts'], stats['created']) == (2, 1, 1, 2, 2)
+
+
+def test_pool_health_check_and_lifetime(monkeypatch):
+    """Тест: неисправное и старое соединения закрываются при выдаче и заменяются новыми"""
+    clock = [100.0]
+    monkeypatch.setattr('api.db_pool.pool.time.monotonic', lambda: clock[0])
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, max_size=2, max_lifetime=60, check=_check, check_interval=5)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.healthy = False
+    assert pool.acquire() is conn  # проверено меньше check_interval назад
+    pool.release(conn)
+
+    clock[0] += 10
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    pool.release(fresh)
+
+    clock[0] += 60
+    assert pool.acquire() is not fresh and fresh.closed
+    stats = pool.stats()
+    assert (stats['size'], stats['check_failures'], stats['closed'], stats['created']) == (1, 1, 2, 3)
+
+
+def test_pool_exhaustion_waits_and_times_out():
+    """Тест: при занятых max_size соединениях запрос ждёт возврата или получает PoolTimeout"""
+    pool = ConnectionPool(FakeConnect(), max_size=1, timeout=0.05)
+    conn = pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+
+    pool.timeout = 5
+    timer = threading.Timer(0.05, pool.release, [conn])
+    timer.start()
+    assert pool.acquire() is conn
+    timer.join()
+
+    stats = pool.stats()
+    assert (stats['waits'], stats['timeouts'], stats['created']) == (2, 1, 1)
+    assert stats['wait_ms'] > 0
+
+
+def test_close_pools_and_fork(monkeypatch):
+    """Тест: close_pools закрывает свободные соединения сразу, выданные — при возврате; после fork пулы забываются"""
+    monkeypatch.setattr(pool_module, '_pools', {})
+    connect = FakeConnect()
+    first = get_pool(('a', ()), connect)
+    other = get_pool(('b', ()), connect)
+    idle, in_use = first.acquire(), first.acquire()
+    first.release(idle)
+
+    close_pools(lambda key: key[0] == 'a')
+    assert idle.closed and not in_use.closed
+    first.release(in_use)
+    assert in_use.closed and first.stats()['size'] == 0
+    assert get_pool(('a', ()), connect) is not first and get_pool(('b', ()), connect) is other
+
+    conn = other.acquire()
+    monkeypatch.setattr(pool_module.os, 'getpid', lambda: -1)
+    pool_module._forget_pools()
+    assert get_pool(('b', ()), connect) is not other
+    # соединение родителя в дочернем процессе не закрывается: это оборвало бы сессию родителя
+    other.release(conn)
+    assert not conn.closed
+
+
+def _settings_dict(name):
+    return {
+        'ENGINE': 'api.db_pool', 'NAME': name, 'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '',
+        'OPTIONS': {}, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'CONN_MAX_AGE': 0, 'TIME_ZONE': None,
+        'POOL': {'MAX_SIZE': 2}, 'TEST': {},
+    }
+
+
+def test_destroy_test_db_closes_pools(monkeypatch):
+    """Тест: перед DROP DATABASE закрываются пулы соединений с удаляемой базой, остальные остаются"""
+    connect = FakeConnect()
+    monkeypatch.setattr(base, '_connect', lambda conn_params: connect())
+    monkeypatch.setattr(pool_module, '_pools', {})
+    dropped, other = base.DatabaseWrapper(_settings_dict('test_db'), alias='default'), \
+        base.DatabaseWrapper(_settings_dict('other_db'), alias='other')
+    for wrapper in (dropped, other):
+        wrapper.connection = wrapper.get_new_connection({'database': wrapper.settings_dict['NAME']})
+        wrapper._close()
+
+    open_at_drop = []
+    monkeypatch.setattr(creation.DatabaseCreation, '_destroy_test_db',
+                        lambda self, name, verbosity: open_at_drop.append([c.closed for c in connect.connections]))
+    dropped.creation._destroy_test_db('test_db', verbosity=0)
+    assert open_at_drop == [[1, 0]]
+
+
+def test_backend_returns_connection_to_pool(monkeypatch):
+    """Тест бэкенда api.db_pool: close() возвращает соединение в пул, открытая транзакция откатывается"""
+    connect = FakeConnect()
+    monkeypatch.setattr(base, '_connect', lambda conn_params: connect())
+    wrapper = base.DatabaseWrapper(_settings_dict('pool_test'), alias='pool_test')
+    conn_params = {'database': 'pool_test'}
+
+    wrapper.connection = wrapper.get_new_connection(conn_params)
+    conn = wrapper.connection
+    conn.status = TRANSACTION_STATUS_INTRANS
+    wrapper._close()
+    assert not conn.closed and conn.rollbacks == 1
+
+    assert wrapper.get_new_connection(conn_params) is conn
+    assert wrapper.pool.stats()['checkouts'] == 2
+
+
+@pytest.mark.skipif(settings.DATABASES['default']['ENGINE'] != 'api.db_pool', reason='нужен PostgreSQL с api.db_pool')
+@pytest.mark.django_db
+def test_drop_database_with_pooled_connections():
+    """Тест на PostgreSQL: DROP DATABASE проходит, хотя соединения с базой вернулись в пул"""
+    name = connection.settings_dict['NAME'] + '_pool_drain'
+    wrapper = base.DatabaseWrapper(dict(connection.settings_dict, NAME=name), alias='pool_drain')
+    with wrapper._nodb_cursor() as cursor:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{name}"')
+        cursor.execute(f'CREATE DATABASE "{name}"')
+    with wrapper.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    wrapper.close()
+    assert wrapper.pool.stats()['idle'] >= 1
+
+    wrapper.creation._destroy_test_db(name, verbosity=0)
+    with wrapper._nodb_cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', [name])
+        assert cursor.fetchone() is None
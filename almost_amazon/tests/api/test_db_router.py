@@ -0,0 +1,224 @@
+import asyncio
+import sqlite3
+from collections import Counter
+from contextlib import ExitStack
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+
+from api import db_router
+from api.async_views import run_in_db_thread
+from api.db_router import ReplicaPool, ReplicaRouter, ReplicaRoutingMiddleware, client_key, replica_reads
+
+
+def _ok(alias):
+    pass
+
+
+def test_replica_pool_weighted_round_robin():
+    """Тест: реплики выбираются по кругу пропорционально весам, без серий подряд"""
+    pool = ReplicaPool({'r1': 3, 'r2': 1, 'off': 0}, check=_ok)
+    chosen = [pool.choose() for _ in range(8)]
+
+    assert Counter(chosen) == {'r1': 6, 'r2': 2}
+    assert chosen[:4] == ['r1', 'r1', 'r2', 'r1']
+    assert pool.stats()['r2'] == {'weight': 1, 'ejected': False, 'reads': 2, 'ejections': 0}
+
+
+def test_replica_pool_ejects_failed_replica(monkeypatch):
+    """Тест: реплика с ошибкой проверки исключается на время, без исправных реплик — основная БД"""
+    clock = [1000.0]
+    monkeypatch.setattr(db_router.time, 'monotonic', lambda: clock[0])
+    down = {'r2'}
+
+    def check(alias):
+        if alias in down:
+            raise OperationalError('нет соединения')
+
+    pool = ReplicaPool({'r1': 1, 'r2': 1}, eject_seconds=30, check_seconds=0, check=check)
+    assert {pool.choose() for _ in range(4)} == {'r1'}
+    assert pool.stats()['r2']['ejected'] and pool.stats()['r2']['ejections'] == 1
+
+    down.add('r1')
+    assert pool.choose() is None
+
+    down.clear()
+    clock[0] += 31
+    assert {pool.choose() for _ in range(4)} == {'r1', 'r2'}
+
+
+def test_router_reads_from_replica_only_when_allowed(monkeypatch):
+    """Тест: с реплики читаются только запросы, разрешённые middleware; запись всегда в основную БД"""
+    monkeypatch.setattr(db_router, 'replica_pool', ReplicaPool({'r1': 1}, check=_ok))
+    router = ReplicaRouter()
+
+    assert router.db_for_read(None) is None
+    token = replica_reads.set(True)
+    try:
+        assert router.db_for_read(None) == 'r1'
+        assert router.db_for_write(None) == 'default'
+    finally:
+        replica_reads.reset(token)
+
+    assert router.allow_migrate('default', 'api')
+    assert not router.allow_migrate('r1', 'api')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_read_your_writes(api_client, product_factory, user_factory, monkeypatch):
+    """Тест: после записи клиент читает с основной БД, другие клиенты — с реплики"""
+    # основная БД подменяет реплику: запросы выполняются, а выбор реплики виден в счётчике
+    pool = ReplicaPool({'default': 1}, check=_ok)
+    monkeypatch.setattr(db_router, 'replica_pool', pool)
+    p = product_factory()
+    writer = user_factory()
+    api_client.force_authenticate(user=writer)
+    api_client.credentials(HTTP_AUTHORIZATION='Token writer')
+
+    assert api_client.get(reverse("products-list")).status_code == HTTP_200_OK
+    assert pool.reads['default'] > 0
+
+    resp = api_client.post(reverse("orders-list"), {"positions": [{"product_id": p.id, "amount": 1}]}, format='json')
+    assert resp.status_code == HTTP_201_CREATED
+    reads = pool.reads['default']
+    assert api_client.get(reverse("orders-list")).status_code == HTTP_200_OK
+    assert pool.reads['default'] == reads
+
+    api_client.credentials(HTTP_AUTHORIZATION='Token reader')
+    assert api_client.get(reverse("orders-list")).status_code == HTTP_200_OK
+    assert pool.reads['default'] > reads
+
+
+def _headers(credentials):
+    """Заголовки ASGI-запроса: AsyncRequestFactory передаёт HTTP_* в scope, а не в заголовки."""
+    return [(b'host', b'testserver'), (b'authorization', credentials.encode())]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_replica_reads(product_factory, user_factory, monkeypatch):
+    """Тест: под ASGI async-представление читает с реплики, недавно писавший клиент — с основной БД"""
+    pool = ReplicaPool({'default': 1}, check=_ok)
+    monkeypatch.setattr(db_router, 'replica_pool', pool)
+    product_factory()
+    reader, writer = user_factory(_quantity=2)
+    Token.objects.create(user=reader, key='reader')
+    Token.objects.create(user=writer, key='writer')
+    cache.set(client_key('Token writer'), True)
+    client = AsyncClient()
+    url = reverse("async_products-list")
+
+    # разные page_size, чтобы ответ не пришёл из кэша ответов
+    assert async_to_sync(client.get)(url + '?page_size=2', headers=_headers('Token reader')).status_code == HTTP_200_OK
+    reads = pool.reads['default']
+    assert reads > 0
+
+    assert async_to_sync(client.get)(url + '?page_size=3', headers=_headers('Token writer')).status_code == HTTP_200_OK
+    assert pool.reads['default'] == reads
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_replica_reads_per_request(monkeypatch):
+    """Тест: у одновременных ASGI-запросов свой replica_reads, и он виден в потоке пула БД"""
+    monkeypatch.setattr(db_router, 'replica_pool', ReplicaPool({'r1': 1}, check=_ok))
+    cache.set(client_key('Token writer'), True)
+
+    async def view(request):
+        await asyncio.sleep(0.05)
+        allowed = await run_in_db_thread(replica_reads.get)
+        return HttpResponse(str(allowed))
+
+    middleware = ReplicaRoutingMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+
+    async def requests():
+        factory = AsyncRequestFactory()
+        return await asyncio.gather(*(
+            middleware(factory.get('/', headers=_headers(credentials)))
+            for credentials in ('Token writer', 'Token reader', 'Token writer')
+        ))
+
+    assert [r.content for r in async_to_sync(requests)()] == [b'False', b'True', b'False']
+    assert replica_reads.get() is False
+
+
+REPLICAS = ('replica1', 'replica2')
+# реплики SQLite, зеркала default, есть в almost_amazon.settings_sqlite
+needs_replicas = pytest.mark.skipif(not set(REPLICAS) <= set(settings.DATABASES),
+                                    reason='нужны реплики replica1 и replica2 в DATABASES')
+
+
+@pytest.fixture
+def replicas(settings, monkeypatch):
+    settings.DATABASE_REPLICAS = dict(settings.DATABASE_REPLICAS, WEIGHTS={'replica1': 3, 'replica2': 1},
+                                      CHECK_SECONDS=0)
+    pool = db_router._build_replica_pool()
+    monkeypatch.setattr(db_router, 'replica_pool', pool)
+    return pool
+
+
+def _queries(func, aliases=('default',) + REPLICAS):
+    """Выполняет func и возвращает SQL по alias БД, без проверок SELECT 1."""
+    with ExitStack() as stack:
+        contexts = {alias: stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in aliases}
+        func()
+    return {alias: [q['sql'] for q in ctx.captured_queries if q['sql'] != 'SELECT 1']
+            for alias, ctx in contexts.items()}
+
+
+@needs_replicas
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_sqlite_replicas_reads_and_writes(api_client, product_factory, user_factory, replicas):
+    """Тест на репликах SQLite: чтение идёт на реплики по весам, запись и чтение после записи — в основную БД"""
+    p = product_factory()
+    api_client.force_authenticate(user=user_factory())
+    api_client.credentials(HTTP_AUTHORIZATION='Token reader')
+    url = reverse("orders-list")
+
+    queries = _queries(lambda: [api_client.get(url) for _ in range(8)])
+    assert queries['default'] == []
+    assert len(queries['replica1']) == 3 * len(queries['replica2']) > 0
+
+    api_client.credentials(HTTP_AUTHORIZATION='Token writer')
+    resp = None
+
+    def write_and_read():
+        nonlocal resp
+        resp = api_client.post(url, {"positions": [{"product_id": p.id, "amount": 1}]}, format='json')
+        assert api_client.get(url).status_code == HTTP_200_OK
+
+    queries = _queries(write_and_read)
+    assert resp.status_code == HTTP_201_CREATED
+    assert any(sql.startswith('INSERT INTO "api_order"') for sql in queries['default'])
+    assert queries['replica1'] == queries['replica2'] == []
+
+    api_client.credentials(HTTP_AUTHORIZATION='Token reader')
+    queries = _queries(lambda: api_client.get(url))
+    assert queries['default'] == []
+    assert any('"api_order"' in sql for sql in queries['replica1'] + queries['replica2'])
+
+
+@needs_replicas
+@pytest.mark.django_db(transaction=True, databases='__all__')
+def test_sqlite_replica_ejected(api_client, user_factory, replicas, monkeypatch):
+    """Тест на репликах SQLite: недоступная реплика исключается, чтение идёт на оставшуюся"""
+    def refuse(conn_params):
+        raise sqlite3.OperationalError('unable to open database file')
+
+    # SQLite в памяти не закрывает соединение в close(), поэтому оно просто забывается
+    monkeypatch.setattr(connections['replica2'], 'connection', None)
+    monkeypatch.setattr(connections['replica2'], 'get_new_connection', refuse)
+    api_client.force_authenticate(user=user_factory())
+
+    queries = _queries(lambda: [api_client.get(reverse("orders-list")) for _ in range(4)], ('default', 'replica1'))
+    assert queries['default'] == []
+    assert len(queries['replica1']) == 4
+    assert replicas.stats()['replica2']['ejected'] and replicas.stats()['replica2']['ejections'] == 1
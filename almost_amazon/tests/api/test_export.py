@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.status import HTTP_200_OK, HTTP_403_FORBIDDEN
+
+from api.export import order_rows
+from api.models import Order
+
+
+def _content(resp):
+    return b''.join(resp.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_orders_export_ndjson(staff_client, order_factory):
+    """Тест выгрузки заказов в NDJSON"""
+    orders = order_factory(_quantity=3)
+    positions = baker.make('Position', order_id=orders[0], _quantity=2)
+    resp = staff_client.get(reverse("orders-export"), {"format": "ndjson"})
+
+    assert resp.status_code == HTTP_200_OK
+    assert resp['Content-Type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in _content(resp).splitlines()]
+    assert [r['id'] for r in rows] == sorted(o.id for o in orders)
+    first = next(r for r in rows if r['id'] == orders[0].id)
+    assert first['positions'] == [{'product_id': p.product_id_id, 'amount': p.amount}
+                                  for p in sorted(positions, key=lambda p: p.product_id_id)]
+
+
+@pytest.mark.django_db
+def test_orders_export_csv_filtered(staff_client, order_factory):
+    """Тест выгрузки заказов в CSV с фильтром OrderFilter"""
+    order_factory(_quantity=2, status='NEW')
+    done = order_factory(_quantity=2, status='DONE')
+    resp = staff_client.get(reverse("orders-export"), {"format": "csv", "status": "DONE"})
+
+    assert resp.status_code == HTTP_200_OK
+    rows = list(csv.DictReader(io.StringIO(_content(resp))))
+    assert [int(r['id']) for r in rows] == sorted(o.id for o in done)
+    assert {r['status'] for r in rows} == {'DONE'}
+
+
+@pytest.mark.django_db
+def test_reviews_export_csv(staff_client, review_factory):
+    """Тест выгрузки отзывов в CSV"""
+    reviews = review_factory(_quantity=3)
+    resp = staff_client.get(reverse("product_reviews-export"), {"format": "csv"})
+
+    assert resp.status_code == HTTP_200_OK
+    rows = list(csv.DictReader(io.StringIO(_content(resp))))
+    assert [int(r['id']) for r in rows] == sorted(r.id for r in reviews)
+
+
+@pytest.mark.django_db
+def test_reviews_export_csv_formula_escaped(staff_client, review_factory):
+    """Тест: текст, который табличный редактор прочитал бы как формулу, в CSV экранируется, в NDJSON — нет"""
+    texts = ['=HYPERLINK("http://evil")', '+1', '-1', '@SUM(A1)', '\tx', '\rx', 'обычный - текст']
+    for text in texts:
+        review_factory(_quantity=1, text=text)
+
+    resp = staff_client.get(reverse("product_reviews-export"), {"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(_content(resp), newline='')))
+    assert [r['text'] for r in rows] == ["'" + text for text in texts[:-1]] + [texts[-1]]
+
+    resp = staff_client.get(reverse("product_reviews-export"), {"format": "ndjson"})
+    assert [json.loads(line)['text'] for line in _content(resp).splitlines()] == texts
+
+
+@pytest.mark.parametrize("url_name", ("orders-export", "product_reviews-export"))
+@pytest.mark.django_db
+def test_export_staff_only(api_client, user_factory, url_name):
+    """Тест: выгрузка доступна только администратору"""
+    api_client.force_authenticate(user=user_factory(_quantity=1)[0])
+    resp = api_client.get(reverse(url_name))
+
+    assert resp.status_code == HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_order_rows_chunked(order_factory, django_assert_num_queries):
+    """Тест: позиции читаются одним запросом на пачку заказов"""
+    order_factory(_quantity=5)
+    with django_assert_num_queries(1 + 3):  # заказы + позиции для пачек 2, 2, 1
+        rows = list(order_rows(Order.objects.all(), chunk_size=2))
+
+    assert len(rows) == 5
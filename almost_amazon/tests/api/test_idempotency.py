@@ -0,0 +1,89 @@
+import io
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_409_CONFLICT, \
+    HTTP_422_UNPROCESSABLE_ENTITY
+
+from api.models import IdempotencyKey, Order
+
+
+@pytest.fixture
+def order_data(product_factory):
+    products = product_factory(_quantity=2)
+    return {"positions": [{"product_id": p.id, "amount": 2} for p in products]}
+
+
+@pytest.mark.django_db
+def test_order_create_replayed_by_idempotency_key(api_client, user_factory, order_data):
+    """Тест: повтор запроса с тем же Idempotency-Key не создаёт второй заказ"""
+    u = user_factory()
+    api_client.force_authenticate(user=u)
+    url = reverse("orders-list")
+    first = api_client.post(url, order_data, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+    with CaptureQueriesContext(connection) as ctx:
+        retry = api_client.post(url, order_data, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+
+    assert first.status_code == retry.status_code == HTTP_201_CREATED
+    assert retry.json() == first.json()
+    assert retry['Idempotent-Replayed'] == 'true'
+    assert len(ctx.captured_queries) == 1
+    assert Order.objects.filter(creator=u).count() == 1
+
+    resp = api_client.post(url, {"positions": order_data["positions"][:1]}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+    assert resp.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+
+    api_client.force_authenticate(user=user_factory())
+    resp = api_client.post(url, order_data, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+    assert resp.status_code == HTTP_201_CREATED
+    assert resp.json()['id'] != first.json()['id']
+
+
+@pytest.mark.django_db
+def test_idempotency_key_not_stored_for_errors(api_client, user_factory, order_data):
+    """Тест: ответ с ошибкой не сохраняется, исправленный запрос с тем же ключом выполняется"""
+    api_client.force_authenticate(user=user_factory())
+    url = reverse("orders-batch")
+    resp = api_client.post(url, [{"positions": []}], format='json', HTTP_IDEMPOTENCY_KEY='batch-1')
+    assert resp.status_code == HTTP_400_BAD_REQUEST
+    assert not IdempotencyKey.objects.exists()
+
+    resp = api_client.post(url, [order_data], format='json', HTTP_IDEMPOTENCY_KEY='batch-1')
+    assert resp.status_code == HTTP_201_CREATED
+    retry = api_client.post(url, [order_data], format='json', HTTP_IDEMPOTENCY_KEY='batch-1')
+    assert retry.json() == resp.json()
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_idempotency_key_in_progress_and_expired(api_client, user_factory, order_data, settings):
+    """Тест: ключ выполняющегося запроса — 409, просроченный ключ — запрос выполняется заново"""
+    api_client.force_authenticate(user=user_factory())
+    url = reverse("orders-list")
+    assert api_client.post(url, order_data, format='json', HTTP_IDEMPOTENCY_KEY='k2').status_code == HTTP_201_CREATED
+    IdempotencyKey.objects.update(status_code=None)
+    resp = api_client.post(url, order_data, format='json', HTTP_IDEMPOTENCY_KEY='k2')
+    assert resp.status_code == HTTP_409_CONFLICT
+
+    IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL + 1))
+    resp = api_client.post(url, order_data, format='json', HTTP_IDEMPOTENCY_KEY='k2')
+    assert resp.status_code == HTTP_201_CREATED
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_purge_idempotency_keys(user_factory):
+    """Тест удаления просроченных ключей"""
+    u = user_factory()
+    old = [IdempotencyKey.objects.create(user=u, key=f'old{i}', fingerprint='') for i in range(3)]
+    fresh = IdempotencyKey.objects.create(user=u, key='fresh', fingerprint='')
+    IdempotencyKey.objects.filter(pk__in=[r.pk for r in old]).update(created_at=timezone.now() - timedelta(days=2))
+
+    call_command('purge_idempotency_keys', batch_size=2, stdout=io.StringIO())
+
+    assert list(IdempotencyKey.objects.values_list('pk', flat=True)) == [fresh.pk]
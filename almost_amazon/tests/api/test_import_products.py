@@ -0,0 +1,46 @@
+import json
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from api.models import Product
+
+
+@pytest.mark.django_db
+def test_import_products_csv_upsert(tmp_path, product_factory):
+    """Тест загрузки товаров из CSV с обновлением по external_id"""
+    existing = product_factory(external_id="A-1", name="старое", price=5)
+    source = tmp_path / "products.csv"
+    source.write_text(
+        "external_id,name,description,price\n"
+        "A-1,чайник,электрический,10.50\n"
+        "A-2,кружка,,3\n"
+        "A-3,бракованный,,-1\n"
+        ",без кода,,1\n",
+        encoding="utf-8",
+    )
+
+    call_command("import_products", str(source), "--batch-size", "2")
+
+    existing.refresh_from_db()
+    assert (existing.name, existing.price) == ("чайник", Decimal("10.50"))
+    assert Product.objects.get(external_id="A-2").name == "кружка"
+    assert not Product.objects.filter(name__in=["бракованный", "без кода"]).exists()
+    assert Product.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_products_jsonl(tmp_path, api_client):
+    """Тест загрузки товаров из JSONL, товары сразу находятся поиском"""
+    source = tmp_path / "products.jsonl"
+    rows = [{"external_id": f"B-{i}", "name": f"лампа {i}", "description": "настольная", "price": "1.00"}
+            for i in range(5)]
+    source.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows), encoding="utf-8")
+
+    call_command("import_products", str(source))
+
+    assert Product.objects.filter(external_id__startswith="B-").count() == 5
+    resp = api_client.get(reverse("products-list"), {"search": "настольная"})
+    assert len(resp.json()['results']) == 5
@@ -0,0 +1,92 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK
+
+from api.filters import OrderFilter, ProductReviewFilter
+from api.models import Order, Product, ProductReview
+from api.search import suggest_products
+
+
+def _plan(sql):
+    """План запроса; на PostgreSQL seq scan запрещается, чтобы маленькие тестовые таблицы не мешали выбору индекса"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def _list_plan(api_client, url, params, table):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(url, params)
+    assert resp.status_code == HTTP_200_OK
+    sql = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith(f'SELECT "{table}"'))
+    return _plan(sql)
+
+
+@pytest.mark.parametrize(["is_staff", "params", "index"],
+                         (
+                                 (False, {}, "api_order_creator_created_idx"),
+                                 (True, {}, "api_order_created_id_idx"),
+                         )
+                         )
+@pytest.mark.django_db
+def test_orders_list_uses_index(api_client, order_factory, user_factory, is_staff, params, index):
+    """Тест: листинг заказов с фильтрами читается по индексу"""
+    u = user_factory(_quantity=1)[0]
+    u.is_staff = is_staff
+    order_factory(_quantity=3, creator=u)
+    api_client.force_authenticate(user=u)
+
+    plan = _list_plan(api_client, reverse("orders-list"), params, "api_order")
+    assert index in plan
+
+
+@pytest.mark.django_db
+def test_reviews_list_uses_index(api_client, review_factory):
+    """Тест: отзывы к товару читаются по индексу"""
+    r = review_factory(_quantity=3)[0]
+    plan = _list_plan(api_client, reverse("product_reviews-list"), {"product_id": r.product_id.id},
+                      "api_productreview")
+    assert "api_review_product_created_idx" in plan
+
+
+@pytest.mark.parametrize(["filterset_class", "model", "params", "index"],
+                         (
+                                 (OrderFilter, Order, {"status": "NEW"}, "api_order_status_created_idx"),
+                                 (ProductReviewFilter, ProductReview, {"stars_from": 4}, "api_review_created_id_idx"),
+                         )
+                         )
+@pytest.mark.django_db
+def test_filtersets_use_index(filterset_class, model, params, index):
+    """Тест: запросы FilterSet с сортировкой пагинации читаются по индексу"""
+    filterset = filterset_class(params, queryset=model.objects.all())
+    assert filterset.is_valid()
+    qs = filterset.qs.order_by('created_at', 'id')[:51]
+    sql, sql_params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        sql = connection.ops.last_executed_query(cursor, sql, sql_params)
+
+    assert index in _plan(sql)
+
+
+@pytest.mark.django_db
+def test_suggest_order_uses_index(product_factory):
+    """Тест: подсказки по короткому префиксу читаются в порядке индекса, без сортировки всех совпадений"""
+    product_factory(_quantity=3)
+    qs = suggest_products(Product.objects.all(), "ab", 10)
+    sql, sql_params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        sql = connection.ops.last_executed_query(cursor, sql, sql_params)
+
+    plan = _plan(sql)
+    if connection.vendor == 'postgresql':
+        assert "api_product_name_prefix" in plan
+        assert "Sort" not in plan
+    else:
+        assert "api_product_name_nocase" in plan
+        assert "TEMP B-TREE" not in plan
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpResponse
+from django.test import AsyncClient, AsyncRequestFactory
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+
+from api.async_views import run_in_db_thread
+from api.middleware import QueryInstrumentationMiddleware, normalize_sql
+from api.models import Product
+
+INSTRUMENTATION = {
+    'SAMPLE_RATE': 1.0,
+    'SLOW_REQUEST_MS': 10000,
+    'N_PLUS_ONE_THRESHOLD': 3,
+    'SLOWEST_QUERIES': 2,
+    'SERVER_TIMING': True,
+}
+
+
+def _events(caplog):
+    return [json.loads(r.getMessage()) for r in caplog.records if r.name == 'api.sql']
+
+
+def test_normalize_sql():
+    """Тест нормализации SQL для поиска N+1"""
+    assert normalize_sql('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21') == \
+        normalize_sql('SELECT * FROM t WHERE id IN (%s) LIMIT 1') == 'SELECT * FROM t WHERE id IN (...) LIMIT ?'
+
+
+@pytest.mark.django_db
+def test_server_timing_header(api_client, settings, review_factory):
+    """Тест заголовка Server-Timing и отсутствия записи в лог для быстрого запроса"""
+    settings.SQL_INSTRUMENTATION = INSTRUMENTATION
+    review_factory(_quantity=3)
+    resp = api_client.get(reverse("product_reviews-list"))
+
+    assert resp.status_code == HTTP_200_OK
+    db, app = resp['Server-Timing'].split(', ')
+    assert db.startswith('db;dur=') and db.endswith('desc="1 queries"')
+    assert app.startswith('app;dur=')
+
+    settings.SQL_INSTRUMENTATION = dict(INSTRUMENTATION, SAMPLE_RATE=0)
+    assert not api_client.get(reverse("product_reviews-list")).has_header('Server-Timing')
+
+
+@pytest.mark.django_db
+def test_slow_request_and_n_plus_one_logged(api_client, settings, caplog, user_factory, product_factory):
+    """Тест: медленный запрос и повторяющийся SQL попадают в лог строкой JSON"""
+    settings.SQL_INSTRUMENTATION = dict(INSTRUMENTATION, SLOW_REQUEST_MS=0)
+    products = product_factory(_quantity=5)
+    api_client.force_authenticate(user=user_factory(is_staff=True))
+    with caplog.at_level(logging.WARNING, logger='api.sql'):
+        resp = api_client.post(reverse("product_collections-list"), {
+            "title": "подборка", "text": "текст", "collection_items": [p.id for p in products],
+        }, format='json')
+
+    assert resp.status_code == HTTP_201_CREATED
+    [event] = _events(caplog)
+    assert event['event'] == 'slow_request'
+    assert (event['method'], event['path'], event['status']) == ('POST', '/api/v1/product-collections/', 201)
+    assert len(event['slowest']) == 2 and event['queries'] >= 5
+    # каждый товар подборки проверяется отдельным запросом
+    assert [e['count'] for e in event['n_plus_one']] == [5]
+    assert 'FROM "api_product"' in event['n_plus_one'][0]['sql']
+
+    resp = api_client.get(reverse("metrics-list"))
+    assert resp.json()['sql_instrumentation']['n_plus_one_requests'] >= 1
+
+
+@pytest.mark.django_db
+def test_admin_changelists_without_n_plus_one(client, settings, caplog, user_factory, review_factory, order_factory):
+    """Тест: списки отзывов и заказов в админке не делают запрос на каждую строку"""
+    settings.SQL_INSTRUMENTATION = INSTRUMENTATION
+    review_factory(_quantity=5)
+    order_factory(_quantity=5)
+    client.force_login(user_factory(is_staff=True, is_superuser=True))
+    with caplog.at_level(logging.WARNING, logger='api.sql'):
+        for url in ("/admin/api/productreview/", "/admin/api/order/"):
+            assert client.get(url).status_code == HTTP_200_OK
+
+    assert _events(caplog) == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_view_queries_counted(api_client, settings, review_factory):
+    """Тест: под ASGI учитываются запросы async-представления из пула потоков БД"""
+    settings.SQL_INSTRUMENTATION = INSTRUMENTATION
+    review_factory(_quantity=3)
+    sync = api_client.get(reverse("product_reviews-list"))['Server-Timing'].split(', ')[0]
+    resp = async_to_sync(AsyncClient().get)(reverse("async_product_reviews-list"))
+
+    assert resp.status_code == HTTP_200_OK
+    assert resp['Server-Timing'].split(', ')[0].endswith(sync.split(';')[-1])
+
+
+def test_instrumentation_not_adapted_to_sync_under_asgi(settings, caplog):
+    """Тест: под ASGI цепочка middleware не переходит в синхронный поток"""
+    settings.DEBUG = True
+    with caplog.at_level(logging.DEBUG, logger='django.request'):
+        ASGIHandler()
+
+    assert [r.getMessage() for r in caplog.records if r.getMessage().endswith('adapted.')] == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_instrumentation_async_concurrent(settings, product_factory):
+    """Тест: одновременные ASGI-запросы выполняются параллельно, и запросы к БД считаются для каждого отдельно"""
+    settings.SQL_INSTRUMENTATION = INSTRUMENTATION
+    product_factory(_quantity=1)
+
+    async def view(request):
+        count = int(request.GET['n'])
+
+        def queries():
+            for _ in range(count):
+                list(Product.objects.all())
+            return HttpResponse()
+
+        await asyncio.sleep(0.3)
+        return await run_in_db_thread(queries)
+
+    middleware = QueryInstrumentationMiddleware(view)
+    assert asyncio.iscoroutinefunction(middleware)
+
+    async def requests():
+        factory = AsyncRequestFactory()
+        return await asyncio.gather(*(middleware(factory.get(f'/?n={n}')) for n in range(1, 6)))
+
+    started = time.perf_counter()
+    responses = async_to_sync(requests)()
+    assert time.perf_counter() - started < 1.0  # по очереди — не меньше 1.5 с
+    assert [r['Server-Timing'].split(', ')[0].split(';')[-1] for r in responses] == \
+        [f'desc="{n} queries"' for n in range(1, 6)]
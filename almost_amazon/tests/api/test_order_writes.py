@@ -0,0 +1,261 @@
+import io
+import random
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, \
+    HTTP_404_NOT_FOUND, HTTP_409_CONFLICT
+
+from api.models import DailySales, Order, Position, Product
+
+
+def _inserts(ctx, table):
+    return [q for q in ctx.captured_queries if q['sql'].startswith(f'INSERT INTO "{table}"')]
+
+
+@pytest.mark.django_db
+def test_order_create_bulk_positions(api_client, product_factory, user_factory):
+    """Тест: позиции заказа пишутся одним INSERT"""
+    products = product_factory(_quantity=5)
+    order_data = {"positions": [{"product_id": p.id, "amount": random.choice([1, 2, 3])} for p in products]}
+    api_client.force_authenticate(user=user_factory(_quantity=1)[0])
+    url = reverse("orders-list")
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.post(url, data=order_data, format='json')
+
+    assert resp.status_code == HTTP_201_CREATED
+    assert len(_inserts(ctx, 'api_position')) == 1
+    total = sum(p.price * e["amount"] for p, e in zip(products, order_data["positions"]))
+    assert Decimal(resp.json().get("total")) == total
+
+
+@pytest.mark.django_db
+def test_orders_batch_create(api_client, product_factory, user_factory):
+    """Тест пакетного создания заказов"""
+    products = product_factory(_quantity=5)
+    batch = [
+        {"positions": [{"product_id": p.id, "amount": random.choice([1, 2, 3])} for p in random.sample(products, 3)]}
+        for _ in range(20)
+    ]
+    u = user_factory(_quantity=1)[0]
+    api_client.force_authenticate(user=u)
+    url = reverse("orders-batch")
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.post(url, data=batch, format='json')
+
+    assert resp.status_code == HTTP_201_CREATED
+    resp_json = resp.json()
+    assert [o.get("positions") for o in resp_json] == [o["positions"] for o in batch]
+    assert Order.objects.filter(creator=u).count() == len(batch)
+    assert Position.objects.count() == 3 * len(batch)
+
+    product_selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and '"api_product"' in q['sql']]
+    assert len(product_selects) == 1
+    assert len(_inserts(ctx, 'api_position')) == 1
+    if connection.features.can_return_rows_from_bulk_insert:
+        assert len(_inserts(ctx, 'api_order')) == 1
+
+
+@pytest.mark.django_db
+def test_orders_batch_invalid_rolls_back(api_client, product_factory, user_factory):
+    """Тест: ошибка в одном заказе отклоняет весь пакет"""
+    p = product_factory(_quantity=1)[0]
+    batch = [{"positions": [{"product_id": p.id, "amount": 1}]}, {"positions": []}]
+    api_client.force_authenticate(user=user_factory(_quantity=1)[0])
+    resp = api_client.post(reverse("orders-batch"), data=batch, format='json')
+
+    assert resp.status_code == HTTP_400_BAD_REQUEST
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_orders_batch_status_forbidden(api_client, product_factory, user_factory):
+    """Тест: в пакете нельзя указывать статус"""
+    p = product_factory(_quantity=1)[0]
+    batch = [{"positions": [{"product_id": p.id, "amount": 1}], "status": "DONE"}]
+    api_client.force_authenticate(user=user_factory(_quantity=1)[0])
+    resp = api_client.post(reverse("orders-batch"), data=batch, format='json')
+
+    assert resp.status_code == HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_order_update_positions_diff(api_client, product_factory, user_factory):
+    """Тест: при изменении заказа пишется только разница позиций"""
+    products = product_factory(_quantity=30)
+    u = user_factory(_quantity=1)[0]
+    api_client.force_authenticate(user=u)
+    positions = [{"product_id": p.id, "amount": 1} for p in products[:20]]
+    resp = api_client.post(reverse("orders-list"), data={"positions": positions}, format='json')
+    order_id = resp.json().get("id")
+
+    positions[0]["amount"] = 5                      # изменена
+    del positions[1]                                # удалена
+    positions.append({"product_id": products[25].id, "amount": 2})  # добавлена
+    url = reverse("orders-detail", args=[order_id])
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.patch(url, data={"positions": positions}, format='json')
+
+    assert resp.status_code == 200
+    writes = [q['sql'].split()[0] for q in ctx.captured_queries
+              if '"api_position"' in q['sql'] and not q['sql'].startswith('SELECT')]
+    assert sorted(writes) == ['DELETE', 'INSERT', 'UPDATE']
+
+    stored = {p.product_id_id: p.amount for p in Position.objects.filter(order_id=order_id)}
+    assert stored == {e["product_id"]: e["amount"] for e in positions}
+    total = sum(p.price * stored[p.id] for p in products if p.id in stored)
+    assert Order.objects.get(pk=order_id).total == total
+
+
+@pytest.mark.django_db
+def test_order_duplicate_products_rejected(api_client, product_factory, user_factory):
+    """Тест: товар не может повторяться в заказе"""
+    p = product_factory(_quantity=1)[0]
+    api_client.force_authenticate(user=user_factory(_quantity=1)[0])
+    order_data = {"positions": [{"product_id": p.id, "amount": 1}, {"product_id": p.id, "amount": 2}]}
+    resp = api_client.post(reverse("orders-list"), data=order_data, format='json')
+
+    assert resp.status_code == HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_order_product_id_type_checked(api_client, product_factory, user_factory):
+    """Тест: product_id принимается только целым числом или строкой из цифр"""
+    p = product_factory(id=1)
+    api_client.force_authenticate(user=user_factory())
+    for product_id in (True, 1.9, "1 ", [1]):
+        resp = api_client.post(reverse("orders-list"), {"positions": [{"product_id": product_id}]}, format='json')
+        assert resp.status_code == HTTP_400_BAD_REQUEST, product_id
+    resp = api_client.post(reverse("orders-list"), {"positions": [{"product_id": str(p.id)}]}, format='json')
+    assert resp.status_code == HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_position_unit_price_snapshot(api_client, product_factory, user_factory):
+    """Тест: позиции хранят цену на момент заказа, сумма не меняется вслед за ценой товара"""
+    p1, p2 = product_factory(_quantity=2, price=Decimal('10.00'))
+    api_client.force_authenticate(user=user_factory())
+    resp = api_client.post(reverse("orders-list"), {"positions": [{"product_id": p1.id, "amount": 2}]}, format='json')
+    order_id = resp.json()['id']
+    Product.objects.update(price=Decimal('15.00'))
+
+    resp = api_client.patch(reverse("orders-detail", args=[order_id]), {"positions": [
+        {"product_id": p1.id, "amount": 3}, {"product_id": p2.id, "amount": 1},
+    ]}, format='json')
+
+    assert Decimal(resp.json()['total']) == Decimal('45.00')
+    prices = dict(Position.objects.filter(order_id=order_id).values_list('product_id', 'unit_price'))
+    assert prices == {p1.id: Decimal('10.00'), p2.id: Decimal('15.00')}
+
+
+@pytest.mark.django_db
+def test_recalculate_order_totals(api_client, product_factory, user_factory, order_factory):
+    """Тест пересчёта сумм заказов командой"""
+    products = product_factory(_quantity=3, price=Decimal('2.50'))
+    api_client.force_authenticate(user=user_factory())
+    api_client.post(reverse("orders-batch"), [
+        {"positions": [{"product_id": p.id, "amount": i + 1} for p in products]} for i in range(5)
+    ], format='json')
+    empty = order_factory()
+    Order.objects.update(total=0)
+
+    call_command('recalculate_order_totals', batch_size=2, stdout=io.StringIO())
+
+    totals = dict(Order.objects.values_list('id', 'total'))
+    assert totals.pop(empty.id) == 0
+    assert sorted(totals.values()) == [Decimal('7.50') * (i + 1) for i in range(5)]
+
+
+@pytest.mark.django_db
+def test_order_transition(api_client, product_factory, user_factory):
+    """Тест перехода заказа по статусам: только вперёд по графу, только администратор"""
+    p = product_factory(price=Decimal('3.00'))
+    user, admin = user_factory(), user_factory(is_staff=True)
+    api_client.force_authenticate(user=user)
+    resp = api_client.post(reverse("orders-list"), {"positions": [{"product_id": p.id, "amount": 2}]}, format='json')
+    order_id = resp.json()['id']
+    url = reverse("orders-transition", args=[order_id])
+
+    assert api_client.post(url, {"status": "IN_PROGRESS"}, format='json').status_code == HTTP_403_FORBIDDEN
+    api_client.force_authenticate(user=admin)
+    assert api_client.post(url, {"status": "NEW"}, format='json').status_code == HTTP_400_BAD_REQUEST
+    resp = api_client.post(url, {"status": "DONE"}, format='json')
+    assert resp.status_code == HTTP_409_CONFLICT
+    assert resp.json()['status'] == "NEW"
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.post(url, {"status": "IN_PROGRESS"}, format='json')
+    assert resp.json() == {"id": order_id, "status": "IN_PROGRESS"}
+    assert len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_order"')]) == 1
+    assert api_client.post(url, {"status": "IN_PROGRESS"}, format='json').status_code == HTTP_409_CONFLICT
+    assert api_client.post(url, {"status": "DONE"}, format='json').status_code == HTTP_200_OK
+    assert Order.objects.get(pk=order_id).status == "DONE"
+    resp = api_client.post(reverse("orders-transition", args=[order_id + 100]), {"status": "DONE"}, format='json')
+    assert resp.status_code == HTTP_404_NOT_FOUND
+
+    days = {(r.status, r.orders, r.units, r.revenue) for r in DailySales.objects.all()}
+    assert days == {("NEW", 0, 0, 0), ("IN_PROGRESS", 0, 0, 0), ("DONE", 1, 2, Decimal('6.00'))}
+
+
+@pytest.mark.django_db
+def test_orders_bulk_transition(api_client, product_factory, user_factory):
+    """Тест перехода пачки заказов: один UPDATE, заказы в другом статусе пропускаются, сводки сходятся"""
+    products = product_factory(_quantity=2)
+    api_client.force_authenticate(user=user_factory(is_staff=True))
+    resp = api_client.post(reverse("orders-batch"), [
+        {"positions": [{"product_id": p.id, "amount": i + 1} for p in products]} for i in range(6)
+    ], format='json')
+    ids = [order['id'] for order in resp.json()]
+    Order.objects.filter(pk__in=ids[:2]).update(status="DONE")
+    call_command('rebuild_sales_summary')
+
+    url = reverse("orders-bulk-transition")
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.post(url, {"ids": ids + [ids[-1] + 100], "status": "IN_PROGRESS"}, format='json')
+    assert resp.status_code == HTTP_200_OK
+    assert resp.json() == {"status": "IN_PROGRESS", "updated": 4, "skipped": 3}
+    assert len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "api_order"')]) == 1
+    assert dict(Order.objects.values_list('id', 'status')) == {
+        **{pk: "DONE" for pk in ids[:2]}, **{pk: "IN_PROGRESS" for pk in ids[2:]},
+    }
+    assert api_client.post(url, {"ids": [], "status": "DONE"}, format='json').status_code == HTTP_400_BAD_REQUEST
+
+    incremental = {(r.date, r.status): (r.orders, r.units, r.revenue) for r in DailySales.objects.exclude(orders=0)}
+    call_command('rebuild_sales_summary')
+    assert {(r.date, r.status): (r.orders, r.units, r.revenue)
+            for r in DailySales.objects.exclude(orders=0)} == incremental
+
+
+@pytest.mark.django_db
+def test_order_transition_returns_only_updated(order_factory, monkeypatch):
+    """Тест: transition возвращает только переведённые заказы, даже если у других то же updated_at"""
+    new, other = order_factory(_quantity=2)
+    now = timezone.now()
+    monkeypatch.setattr(timezone, 'now', lambda: now)
+    Order.objects.filter(pk=other.pk).update(status="IN_PROGRESS", updated_at=now)
+
+    updated, orders = Order.objects.filter(pk__in=[new.pk, other.pk]).transition("IN_PROGRESS")
+
+    assert updated == 1
+    assert [o.pk for o in orders] == [new.pk]
+
+
+@pytest.mark.django_db
+def test_order_patch_status_follows_transitions(api_client, product_factory, user_factory):
+    """Тест: администратор меняет статус в PATCH только по графу переходов"""
+    p = product_factory()
+    api_client.force_authenticate(user=user_factory(is_staff=True))
+    resp = api_client.post(reverse("orders-list"), {"positions": [{"product_id": p.id, "amount": 1}]}, format='json')
+    url = reverse("orders-detail", args=[resp.json()['id']])
+
+    for status in ("DONE", "BOGUS"):
+        assert api_client.patch(url, {"status": status}, format='json').status_code == HTTP_400_BAD_REQUEST
+    assert api_client.patch(url, {"status": "NEW"}, format='json').status_code == HTTP_200_OK
+    assert api_client.patch(url, {"status": "IN_PROGRESS"}, format='json').status_code == HTTP_200_OK
+    assert api_client.patch(url, {"status": "NEW"}, format='json').status_code == HTTP_400_BAD_REQUEST
+    assert api_client.patch(url, {"status": "DONE"}, format='json').json()['status'] == "DONE"
@@ -0,0 +1,96 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND
+
+
+def _walk(api_client, url, params):
+    """Проходит все страницы по ссылкам next и собирает результаты"""
+    pages = []
+    resp = api_client.get(url, params)
+    while True:
+        assert resp.status_code == HTTP_200_OK
+        resp_json = resp.json()
+        pages.append(resp_json)
+        if not resp_json['next']:
+            return pages
+        resp = api_client.get(resp_json['next'])
+
+
+@pytest.mark.django_db
+def test_product_pagination_walk(api_client, product_factory):
+    """Тест обхода всех страниц товаров курсором"""
+    products = product_factory(_quantity=7)
+    url = reverse("products-list")
+    pages = _walk(api_client, url, {"page_size": 3})
+
+    assert [len(p['results']) for p in pages] == [3, 3, 1]
+    ids = [item['id'] for p in pages for item in p['results']]
+    assert ids == sorted(p.id for p in products)
+    assert pages[0]['previous'] is None
+
+    resp = api_client.get(pages[-1]['previous'])
+    assert [item['id'] for item in resp.json()['results']] == ids[3:6]
+
+
+@pytest.mark.django_db
+def test_review_pagination_with_filter(api_client, review_factory):
+    """Тест пагинации отзывов вместе с фильтром"""
+    reviews = review_factory(_quantity=4, stars=5) + review_factory(_quantity=4, stars=1)
+    url = reverse("product_reviews-list")
+    pages = _walk(api_client, url, {"page_size": 3, "stars_from": 4})
+
+    ids = [item['id'] for p in pages for item in p['results']]
+    assert ids == [r.id for r in reviews if r.stars == 5]
+
+
+@pytest.mark.django_db
+def test_pagination_without_count_and_offset(api_client, product_factory):
+    """Тест: страницы выбираются без COUNT(*) и OFFSET"""
+    product_factory(_quantity=5)
+    url = reverse("products-list")
+    first = api_client.get(url, {"page_size": 2}).json()
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(first['next'])
+
+    assert resp.status_code == HTTP_200_OK
+    sql = ' '.join(q['sql'].upper() for q in ctx.captured_queries)
+    assert 'COUNT(' not in sql
+    assert 'OFFSET' not in sql
+
+
+@pytest.mark.django_db
+def test_keyset_predicate_uses_index_range(api_client, review_factory):
+    """Тест: условие курсора по (created_at, id) начинается с диапазона по created_at и читается по индексу"""
+    review_factory(_quantity=5)
+    url = reverse("product_reviews-list")
+    first = api_client.get(url, {"page_size": 2}).json()
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert api_client.get(first['next']).status_code == HTTP_200_OK
+    sql = next(q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT "api_productreview"'))
+    where = sql[sql.index(' WHERE '):]
+    assert where.startswith(' WHERE ("api_productreview"."created_at" >= ')
+    assert ' AND ("api_productreview"."created_at" > ' in where
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            assert 'Index Cond' in plan and 'created_at' in plan
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = '\n'.join(str(row[-1]) for row in cursor.fetchall())
+            assert 'api_review_created_id_idx (created_at>?)' in plan
+
+
+@pytest.mark.django_db
+def test_pagination_invalid_cursor(api_client):
+    """Тест некорректного курсора"""
+    url = reverse("products-list")
+    resp = api_client.get(url, {"cursor": "garbage"})
+
+    assert resp.status_code == HTTP_404_NOT_FOUND
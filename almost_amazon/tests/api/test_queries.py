@@ -0,0 +1,91 @@
+import random
+
+import pytest
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.status import HTTP_200_OK, HTTP_404_NOT_FOUND
+
+
+# бюджеты не зависят от числа объектов: список и деталь — постоянное число запросов
+ORDER_QUERY_BUDGET = 2
+REVIEW_QUERY_BUDGET = 1
+COLLECTION_QUERY_BUDGET = 2
+
+
+@pytest.fixture
+def orders_with_positions(order_factory):
+    orders = order_factory(_quantity=10)
+    for o in orders:
+        baker.make('Position', order_id=o, _quantity=3)
+    return orders
+
+
+@pytest.mark.django_db
+def test_orders_list_queries(staff_client, orders_with_positions, django_assert_max_num_queries):
+    """Тест числа запросов при листинге заказов"""
+    url = reverse("orders-list")
+    with django_assert_max_num_queries(ORDER_QUERY_BUDGET):
+        resp = staff_client.get(url)
+
+    assert resp.status_code == HTTP_200_OK
+    resp_json = resp.json()['results']
+    assert len(resp_json) == len(orders_with_positions)
+    assert all(len(o['positions']) == 3 for o in resp_json)
+
+
+@pytest.mark.django_db
+def test_orders_retrieve_queries(staff_client, orders_with_positions, django_assert_max_num_queries):
+    """Тест числа запросов при извлечении заказа"""
+    o = random.choice(orders_with_positions)
+    url = reverse("orders-detail", args=[o.id])
+    with django_assert_max_num_queries(ORDER_QUERY_BUDGET):
+        resp = staff_client.get(url)
+
+    assert resp.status_code == HTTP_200_OK
+    assert resp.json()['creator']['id'] == o.creator.id
+
+
+@pytest.mark.django_db
+def test_orders_scoped_to_creator(api_client, order_factory, user_factory, django_assert_max_num_queries):
+    """Тест: клиент видит только свои заказы, фильтры списка работают, чужой заказ — 404 одним запросом"""
+    u, other = user_factory(_quantity=2)
+    own = order_factory(_quantity=3, creator=u, status='NEW')
+    order_factory(creator=u, status='DONE')
+    foreign = order_factory(_quantity=3, creator=other, status='NEW')
+    api_client.force_authenticate(user=u)
+
+    with django_assert_max_num_queries(ORDER_QUERY_BUDGET):
+        resp = api_client.get(reverse("orders-list"), {"status": "NEW"})
+    assert resp.status_code == HTTP_200_OK
+    assert sorted(o['id'] for o in resp.json()['results']) == sorted(o.id for o in own)
+
+    with django_assert_max_num_queries(1):
+        resp = api_client.get(reverse("orders-detail", args=[foreign[0].id]))
+    assert resp.status_code == HTTP_404_NOT_FOUND
+    assert api_client.delete(reverse("orders-detail", args=[foreign[1].id])).status_code == HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_reviews_list_queries(api_client, review_factory, django_assert_max_num_queries):
+    """Тест числа запросов при листинге отзывов"""
+    review_factory(_quantity=10)
+    url = reverse("product_reviews-list")
+    with django_assert_max_num_queries(REVIEW_QUERY_BUDGET):
+        resp = api_client.get(url)
+
+    assert resp.status_code == HTTP_200_OK
+    assert len(resp.json()['results']) == 10
+
+
+@pytest.mark.django_db
+def test_collections_list_queries(api_client, collection_factory, product_factory,
+                                  django_assert_max_num_queries):
+    """Тест числа запросов при листинге подборок"""
+    products = product_factory(_quantity=3)
+    collection_factory(_quantity=10, collection_items=products)
+    url = reverse("product_collections-list")
+    with django_assert_max_num_queries(COLLECTION_QUERY_BUDGET):
+        resp = api_client.get(url)
+
+    assert resp.status_code == HTTP_200_OK
+    assert all(len(c['collection_items']) == 3 for c in resp.json()['results'])
@@ -0,0 +1,76 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT
+
+from api.models import Product
+
+
+@pytest.mark.django_db
+def test_rating_maintained_on_review_changes(api_client, user_factory, product_factory):
+    """Тест инкрементального пересчёта рейтинга товара"""
+    p = product_factory(_quantity=1)[0]
+    users = user_factory(_quantity=3)
+    url = reverse("product_reviews-list")
+    ids = []
+    for u, stars in zip(users, (5, 4, 3)):
+        api_client.force_authenticate(user=u)
+        resp = api_client.post(url, {"product_id": p.id, "text": "отзыв", "stars": stars})
+        assert resp.status_code == HTTP_201_CREATED
+        ids.append(resp.json()['id'])
+
+    p.refresh_from_db()
+    assert p.review_count == 3
+    assert p.rating_avg == pytest.approx(4)
+
+    resp = api_client.patch(reverse("product_reviews-detail", args=[ids[2]]), {"stars": 0})
+    assert resp.status_code == HTTP_200_OK
+    p.refresh_from_db()
+    assert p.review_count == 3
+    assert p.rating_avg == pytest.approx(3)
+
+    resp = api_client.delete(reverse("product_reviews-detail", args=[ids[2]]))
+    assert resp.status_code == HTTP_204_NO_CONTENT
+    p.refresh_from_db()
+    assert p.review_count == 2
+    assert p.rating_avg == pytest.approx(4.5)
+
+    resp = api_client.get(reverse("products-detail", args=[p.id]))
+    assert resp.json()['review_count'] == 2
+    assert resp.json()['rating_avg'] == pytest.approx(4.5)
+
+
+@pytest.mark.django_db
+def test_rebuild_product_ratings(product_factory, review_factory):
+    """Тест пересчёта рейтингов командой"""
+    p, empty = product_factory(_quantity=2)
+    review_factory(product_id=p, stars=2)
+    review_factory(product_id=p, stars=5)
+    Product.objects.update(rating_avg=0, review_count=0)
+
+    call_command('rebuild_product_ratings')
+
+    p.refresh_from_db()
+    empty.refresh_from_db()
+    assert (p.review_count, p.rating_avg) == (2, pytest.approx(3.5))
+    assert (empty.review_count, empty.rating_avg) == (0, 0)
+
+
+@pytest.mark.django_db
+def test_products_rating_filter_and_ordering(api_client, product_factory, review_factory):
+    """Тест фильтра rating_from и сортировки по рейтингу вместе с пагинацией"""
+    products = product_factory(_quantity=6)
+    for p, stars in zip(products, (1, 5, 3, 4, 2, 4)):
+        review_factory(product_id=p, stars=stars)
+
+    url = reverse("products-list")
+    resp = api_client.get(url, {"rating_from": 3, "ordering": "-rating_avg", "page_size": 2})
+    ids = []
+    while True:
+        assert resp.status_code == HTTP_200_OK
+        ids += [item['id'] for item in resp.json()['results']]
+        if not resp.json()['next']:
+            break
+        resp = api_client.get(resp.json()['next'])
+
+    assert ids == [products[1].id, products[3].id, products[5].id, products[2].id]
@@ -0,0 +1,77 @@
+import datetime
+import io
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from api import renderers
+from api.renderers import FastJSONParser, FastJSONRenderer
+
+DATA = OrderedDict([
+    ('price', Decimal('10.50')),
+    ('total', '1234.00'),
+    ('created_at', datetime.datetime(2021, 3, 4, 5, 6, 7, 891011, tzinfo=timezone.utc)),
+    ('updated_at', datetime.datetime(2021, 3, 4, 5, 6, 7, tzinfo=datetime.timezone(datetime.timedelta(hours=3)))),
+    ('day', datetime.date(2021, 3, 4)),
+    ('time', datetime.time(5, 6, 7, 891011)),
+    ('uuid', uuid.UUID('12345678-1234-5678-1234-567812345678')),
+    ('lazy', gettext_lazy('Создан')),
+    ('text', 'строка с разделителем и "кавычками"'),
+    ('ids', (1, 2, 3)),
+    (7, [None, True, 1.5, 2 ** 70]),
+])
+
+
+def test_fast_renderer_matches_drf():
+    """Тест: рендерер на orjson выдаёт те же байты, что и JSONRenderer DRF"""
+    assert renderers.orjson is not None
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+    assert FastJSONRenderer().render([DATA, {}]) == JSONRenderer().render([DATA, {}])
+    indented = 'application/json; indent=4'
+    assert FastJSONRenderer().render(DATA, indented) == JSONRenderer().render(DATA, indented)
+
+
+def test_fast_renderer_and_parser_fallback(monkeypatch):
+    """Тест: без orjson работают стандартные рендерер и парсер DRF"""
+    monkeypatch.setattr(renderers, 'orjson', None)
+    assert FastJSONRenderer().render(DATA) == JSONRenderer().render(DATA)
+    body = b'{"positions": [{"product_id": 1, "amount": 2}]}'
+    assert FastJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+@pytest.mark.parametrize("body", [
+    b'{"positions": [{"product_id": 1, "amount": 2}], "price": 10.5}',
+    '{"text": "отзыв", "big": 123456789012345678901234567890}'.encode(),
+    b'[]',
+])
+def test_fast_parser_matches_drf(body):
+    """Тест: парсер на orjson разбирает тело так же, как JSONParser DRF"""
+    assert FastJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+
+@pytest.mark.parametrize("body", [b'{"a": ', b'{"a": NaN}', b''])
+def test_fast_parser_errors(body):
+    """Тест: некорректный JSON — ParseError, как в DRF"""
+    with pytest.raises(ParseError) as fast:
+        FastJSONParser().parse(io.BytesIO(body))
+    with pytest.raises(ParseError) as drf:
+        JSONParser().parse(io.BytesIO(body))
+    assert str(fast.value) == str(drf.value)
+
+
+@pytest.mark.django_db
+def test_api_uses_fast_renderer(api_client, review_factory):
+    """Тест: API отвечает через FastJSONRenderer"""
+    review_factory(_quantity=2)
+    resp = api_client.get(reverse("product_reviews-list"))
+
+    assert isinstance(resp.accepted_renderer, FastJSONRenderer)
+    assert resp.content == JSONRenderer().render(resp.data)
@@ -0,0 +1,109 @@
+from importlib import import_module
+
+import pytest
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.urls import reverse
+from rest_framework.status import HTTP_200_OK
+
+from api import search
+from api.models import Product
+from api.search import suggest_products
+
+
+@pytest.mark.django_db
+def test_product_search_ranked(api_client, product_factory):
+    """Тест полнотекстового поиска товаров с ранжированием"""
+    in_description = product_factory(name="чайник", description="электрический, со свистком")
+    in_name = product_factory(name="свисток судейский", description="")
+    product_factory(name="кружка", description="керамическая")
+
+    url = reverse("products-list")
+    resp = api_client.get(url, {"search": "свисток"})
+
+    assert resp.status_code == HTTP_200_OK
+    ids = [p['id'] for p in resp.json()['results']]
+    assert in_name.id in ids
+    assert set(ids) <= {in_name.id, in_description.id}
+    assert ids[0] == in_name.id
+
+
+@pytest.mark.django_db
+def test_product_search_follows_updates(api_client, product_factory):
+    """Тест: поисковый индекс обновляется при сохранении и удалении товара"""
+    p = product_factory(name="старое название", description="")
+    url = reverse("products-list")
+
+    p.name = "новое название"
+    p.save()
+    assert api_client.get(url, {"search": "старое"}).json()['results'] == []
+    assert [r['id'] for r in api_client.get(url, {"search": "новое"}).json()['results']] == [p.id]
+
+    p.delete()
+    assert api_client.get(url, {"search": "новое"}).json()['results'] == []
+
+
+@pytest.mark.django_db
+def test_product_search_paginated(api_client, product_factory):
+    """Тест поиска вместе с пагинацией и спецсимволами в запросе"""
+    products = product_factory(_quantity=5, name="лампа", description="")
+    url = reverse("products-list")
+    first = api_client.get(url, {"search": "лампа", "page_size": 3}).json()
+    second = api_client.get(first['next']).json()
+
+    ids = [p['id'] for p in first['results'] + second['results']]
+    assert sorted(ids) == sorted(p.id for p in products)
+    assert api_client.get(url, {"search": 'лампа" OR *'}).status_code == HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_product_suggest(api_client, product_factory):
+    """Тест подсказок по префиксу названия"""
+    product_factory(name="Teapot")
+    product_factory(name="tea set")
+    product_factory(name="Coffee pot")
+    url = reverse("products-suggest")
+
+    resp = api_client.get(url, {"q": "tea"})
+    assert resp.status_code == HTTP_200_OK
+    # порядок без учёта регистра: "TEA SET" < "TEAPOT"
+    assert [p['name'] for p in resp.json()] == ["tea set", "Teapot"]
+    assert set(resp.json()[0]) == {"id", "name"}
+
+    assert len(api_client.get(url, {"q": "tea", "limit": 1}).json()) == 1
+    assert api_client.get(url, {"q": "t"}).json() == []
+
+
+@pytest.mark.django_db
+def test_product_suggest_uses_index(product_factory):
+    """Тест: подсказки читаются по индексу, а не полным сканированием"""
+    product_factory(_quantity=3)
+    qs = suggest_products(Product.objects.all(), "ab", 10)
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            # на маленькой тестовой таблице планировщик иначе выберет seq scan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = qs.explain()
+        assert 'api_product_name_prefix' in plan
+        assert 'Index Scan' in plan or 'Bitmap Index Scan' in plan
+        assert 'Index Cond' in plan
+    if connection.vendor == 'sqlite':
+        plan = qs.explain()
+        assert 'USING COVERING INDEX api_product_name_nocase' in plan or 'USING INDEX api_product_name_nocase' in plan
+
+
+def test_product_suggest_postgresql_sql_matches_index(monkeypatch):
+    """Тест: на PostgreSQL отбор и сортировка подсказок идут по выражению индекса api_product_name_prefix без приведений"""
+    pg = DatabaseWrapper({
+        'ENGINE': 'django.db.backends.postgresql', 'NAME': 'suggest', 'USER': '', 'PASSWORD': '', 'HOST': '',
+        'PORT': '', 'OPTIONS': {}, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'CONN_MAX_AGE': 0,
+        'TIME_ZONE': None, 'TEST': {},
+    }, alias='default')
+    monkeypatch.setattr(search, 'connections', {'default': pg})
+    sql, params = suggest_products(Product.objects.all(), "ab", 10).query.get_compiler(connection=pg).as_sql()
+
+    key = '(UPPER("api_product"."name"::text) COLLATE "C")'
+    migration = import_module('api.migrations.0010_product_name_prefix_order')
+    assert migration.CREATE_POSTGRES_SQL.endswith('((UPPER(name::text) COLLATE "C"), id)')
+    assert f'WHERE ({key} >= %s AND {key} < %s) ORDER BY {key} ASC, "api_product"."id" ASC' in sql
+    assert params == ('AB', 'AC')
@@ -0,0 +1,107 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from model_bakery import baker
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED
+
+from api.serializers import ProductSerializer
+
+
+def _selects(ctx):
+    return [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('SELECT')]
+
+
+@pytest.mark.django_db
+def test_products_fields(api_client, product_factory):
+    """Тест ?fields= для товаров: в ответе и в SQL только запрошенные колонки"""
+    p = product_factory(description='длинное описание')
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(reverse("products-list"), {"fields": "id,name,price"})
+    assert resp.status_code == HTTP_200_OK
+    assert resp.json()['results'] == [{"id": p.id, "name": p.name, "price": f'{p.price:.2f}'}]
+    assert not any('"description"' in sql for sql in _selects(ctx))
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(reverse("products-detail", args=[p.id]), {"fields": "name,unknown"})
+    assert resp.json() == {"name": p.name}
+    assert not any('"description"' in sql for sql in _selects(ctx))
+
+
+@pytest.mark.django_db
+def test_orders_fields_skip_eager_loading(api_client, order_factory, user_factory):
+    """Тест: без полей creator и positions заказы читаются одним запросом без JOIN и prefetch"""
+    u = user_factory()
+    orders = order_factory(_quantity=3, creator=u)
+    for o in orders:
+        baker.make('Position', order_id=o, _quantity=2)
+    api_client.force_authenticate(user=u)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(reverse("orders-list"), {"fields": "id,status"})
+    assert resp.status_code == HTTP_200_OK
+    assert sorted(resp.json()['results'], key=lambda o: o['id']) == [
+        {"id": o.id, "status": o.status} for o in sorted(orders, key=lambda o: o.id)
+    ]
+    selects = _selects(ctx)
+    assert len(selects) == 1
+    assert 'JOIN' not in selects[0] and '"total"' not in selects[0]
+
+    resp = api_client.get(reverse("orders-detail", args=[orders[0].id]), {"fields": "id,positions"})
+    assert len(resp.json()['positions']) == 2
+
+
+@pytest.mark.django_db
+def test_order_retrieve_fields_loads_permission_columns(api_client, order_factory, user_factory):
+    """Тест: ?fields= без creator не откладывает creator_id, проверка прав не делает лишний запрос"""
+    u = user_factory()
+    o = order_factory(creator=u, total=10)
+    api_client.force_authenticate(user=u)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = api_client.get(reverse("orders-detail", args=[o.id]), {"fields": "id,total"})
+    assert resp.status_code == HTTP_200_OK
+    assert resp.json() == {"id": o.id, "total": "10.00"}
+    selects = _selects(ctx)
+    assert len(selects) == 1
+    assert '"creator_id"' in selects[0].split(' FROM ')[0]
+
+
+@pytest.mark.django_db
+def test_collections_expand(api_client, collection_factory, product_factory, django_assert_max_num_queries):
+    """Тест ?expand=collection_items: товары подборок одним prefetch"""
+    products = product_factory(_quantity=3)
+    collection_factory(_quantity=5, collection_items=products)
+    expected = sorted(ProductSerializer(products, many=True).data, key=lambda p: p['id'])
+
+    with django_assert_max_num_queries(2):
+        resp = api_client.get(reverse("product_collections-list"),
+                              {"expand": "collection_items", "fields": "id,collection_items"})
+    assert resp.status_code == HTTP_200_OK
+    for collection in resp.json()['results']:
+        assert set(collection) == {"id", "collection_items"}
+        assert sorted(collection['collection_items'], key=lambda p: p['id']) == expected
+
+    resp = api_client.get(reverse("product_collections-list"))
+    assert resp.json()['results'][0]['collection_items'] == [p.id for p in products]
+
+
+@pytest.mark.django_db
+def test_reviews_expand_values_path(api_client, review_factory, product_factory, user_factory):
+    """Тест ?expand=product_id у отзывов через values(); запись ?fields= не учитывает"""
+    p = product_factory()
+    review_factory(_quantity=3, product_id=p)
+    p.refresh_from_db()
+
+    resp = api_client.get(reverse("product_reviews-list"), {"expand": "product_id", "fields": "id,product_id"})
+    assert resp.status_code == HTTP_200_OK
+    assert all(r['product_id'] == ProductSerializer(p).data for r in resp.json()['results'])
+    resp = api_client.get(reverse("product_reviews-list"))
+    assert all(isinstance(r['product_id'], int) for r in resp.json()['results'])
+
+    api_client.force_authenticate(user=user_factory())
+    resp = api_client.post(reverse("product_reviews-list") + '?fields=id',
+                           {"product_id": product_factory().id, "text": "отзыв", "stars": 4})
+    assert resp.status_code == HTTP_201_CREATED
+    assert resp.json()['text'] == "отзыв"
@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.status import HTTP_200_OK
+
+from api import mixins
+from api.models import Product, ProductReview
+from api.serializers import ProductCollectionSerializer, ProductReviewSerializer, ProductSerializer
+from api.values import compile_values_serializer
+from api.views import ProductReviewViewSet
+
+from .test_benchmarks import write_report
+
+
+def _render_both(serializer_class, queryset):
+    values_serializer = compile_values_serializer(serializer_class())
+    assert values_serializer is not None
+    rows = queryset.values(*values_serializer.columns)
+    fast = JSONRenderer().render(values_serializer.to_representation(rows))
+    slow = JSONRenderer().render(serializer_class(queryset, many=True).data)
+    return fast, slow
+
+
+@pytest.mark.django_db
+def test_values_serializer_parity(product_factory, review_factory):
+    """Тест: быстрый путь через values() даёт те же байты, что и сериализатор"""
+    for price in ('0.5', '10', '12345678.99', '3.10'):
+        product_factory(price=Decimal(price), rating_avg=4.25, description='')
+    review_factory(_quantity=5, text='отзыв "с кавычками"')
+
+    fast, slow = _render_both(ProductSerializer, Product.objects.order_by('id'))
+    assert fast == slow
+    fast, slow = _render_both(ProductReviewSerializer, ProductReview.objects.select_related('creator').order_by('id'))
+    assert fast == slow
+    assert compile_values_serializer(ProductCollectionSerializer()) is None
+
+
+@pytest.mark.django_db
+def test_list_endpoints_use_values_path(api_client, product_factory, review_factory):
+    """Тест: списки товаров и отзывов через быстрый путь совпадают с сериализатором, курсор работает"""
+    product_factory(_quantity=5)
+    review_factory(_quantity=5)
+    for name, serializer_class, model in (("products-list", ProductSerializer, Product),
+                                          ("product_reviews-list", ProductReviewSerializer, ProductReview)):
+        expected = serializer_class(model.objects.order_by('created_at', 'id'), many=True).data
+        resp = api_client.get(reverse(name), {"page_size": 3, "ordering": "created_at"})
+        results = []
+        while True:
+            assert resp.status_code == HTTP_200_OK
+            results += resp.json()['results']
+            if not resp.json()['next']:
+                break
+            resp = api_client.get(resp.json()['next'])
+        assert results == json.loads(JSONRenderer().render(expected))
+
+
+@pytest.mark.django_db
+def test_values_path_opt_in(api_client, review_factory, monkeypatch):
+    """Тест: без values_list = True у ViewSet список строится сериализатором"""
+    review_factory(_quantity=3)
+    compiled = []
+    monkeypatch.setattr(mixins, 'compile_values_serializer',
+                        lambda serializer: compiled.append(serializer) or compile_values_serializer(serializer))
+    fast = api_client.get(reverse("product_reviews-list")).json()
+    assert len(compiled) == 1
+
+    monkeypatch.setattr(ProductReviewViewSet, 'values_list', False)
+    assert api_client.get(reverse("product_reviews-list")).json() == fast
+    assert len(compiled) == 1
+    assert mixins.ValuesListMixin.values_list is False
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_benchmark_values_serialization(product_factory, review_factory, tmp_path):
+    """Сравнение времени сериализации 10k строк сериализатором и через values()"""
+    rows = int(os.environ.get('BENCH_ROWS', 10000))
+    products = product_factory(_quantity=rows, _bulk_create=True)
+    review_factory(_quantity=rows, product_id=products[0], _bulk_create=True)
+
+    results = {}
+    for serializer_class, queryset in ((ProductSerializer, Product.objects.order_by('id')),
+                                       (ProductReviewSerializer,
+                                        ProductReview.objects.select_related('creator').order_by('id'))):
+        timings = {}
+        for path in ('serializer', 'values'):
+            started = time.perf_counter()
+            if path == 'serializer':
+                JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+            else:
+                values_serializer = compile_values_serializer(serializer_class())
+                JSONRenderer().render(values_serializer.to_representation(queryset.values(*values_serializer.columns)))
+            timings[path] = time.perf_counter() - started
+        results[serializer_class.__name__] = {
+            'serializer_s': round(timings['serializer'], 3),
+            'values_s': round(timings['values'], 3),
+            'speedup': round(timings['serializer'] / timings['values'], 1),
+        }
+    write_report('values-serialization', {'meta': {'rows': rows}, 'results': results}, tmp_path)
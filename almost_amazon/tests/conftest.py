@@ -1,16 +1,30 @@
 import pytest
 from django.conf import settings
+from django.core.cache import caches
 
 
 from rest_framework.test import APIClient, force_authenticate
 from model_bakery import baker
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    for cache in caches.all():
+        cache.clear()
+
 @pytest.fixture
 def api_client():
     c = APIClient()
     return c
 
+@pytest.fixture
+def staff_client(api_client, user_factory):
+    a = user_factory(_quantity=1)[0]
+    a.is_staff = True
+    api_client.force_authenticate(user=a)
+    return api_client
+
 @pytest.fixture
 def product_factory():
     def factory(**kwargs):
@@ -44,4 +58,11 @@ def collection_factory():
     def factory(**kwargs):
         return baker.make('ProductCollection', **kwargs)
 
+    return factory
+
+@pytest.fixture
+def position_factory():
+    def factory(**kwargs):
+        return baker.make('Position', **kwargs)
+
     return factory
\ No newline at end of file